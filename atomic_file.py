@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+def rotate_backups(file_name, count):
+    """Keep the current file as file.bak1, shifting older copies up to file.bak<count>."""
+    if count <= 0 or not os.path.exists(file_name):
+        return
+    for n in range(count - 1, 0, -1):
+        older = f"{file_name}.bak{n}"
+        if os.path.exists(older):
+            os.replace(older, f"{file_name}.bak{n + 1}")
+    newest = f"{file_name}.bak1"
+    if os.path.exists(newest):
+        os.remove(newest)
+    try:
+        # A hard link keeps the live file in place until the final rename
+        os.link(file_name, newest)
+    except OSError:
+        shutil.copy2(file_name, newest)
+
+
+def _fsync_directory(directory):
+    if not hasattr(os, 'O_DIRECTORY'):
+        return  # Windows has no directory handles to fsync
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(file_name, mode='w', encoding='utf-8', backups=0):
+    """Write to a temp file next to file_name, fsync it and rename it over the target.
+
+    The target is either the old file or the complete new one, never a partial
+    write. With backups > 0 the previous version is kept as file.bak1..bakN.
+    """
+    # realpath: a symlinked config keeps its link, the file it points to is replaced
+    file_name = os.path.realpath(file_name)
+    directory = os.path.dirname(file_name)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{os.path.basename(file_name)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_name):
+            shutil.copymode(file_name, temp_name)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_name, 0o666 & ~umask)
+        rotate_backups(file_name, backups)
+        os.replace(temp_name, file_name)
+        _fsync_directory(directory)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import pickle
+import sys
+
+from atomic_file import atomic_write
+from type_record import TypeRecord, load_records
+
+# Everything but `extra`: the fields "Standard" can reset
+FIELDS = TypeRecord.__slots__[:-1]
+CACHE_VERSION = 1
+log = logging.getLogger(__name__)
+
+
+def app_dir():
+    # The cx_Freeze build keeps modules in a zip next to the executable
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+BASELINE_FILE = os.path.join(app_dir(), 'Config', 'types.xml')
+
+
+def _digest(file_name):
+    h = hashlib.sha1()
+    with open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class BaselineStore:
+    """Vanilla values of every type in Config/types.xml, by name, for "Standard".
+
+    The parsed rows are cached in a pickle next to the XML (types.xml.cache).
+    The cache is used as is while the file's mtime and size match, after a
+    content hash check if only the mtime moved, and rebuilt otherwise. A cache
+    that cannot be written (read-only install) just means parsing each time.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows  # name -> tuple of values in FIELDS order
+        self._columns = {}
+
+    @classmethod
+    def load(cls, file_name=BASELINE_FILE, cache_file=None):
+        cache_file = cache_file or file_name + '.cache'
+        stat = os.stat(file_name)
+        cached = cls._read_cache(cache_file)
+        if cached is not None:
+            if cached['stat'] == (stat.st_mtime_ns, stat.st_size):
+                return cls(cached['rows'])
+            digest = _digest(file_name)
+            if cached['sha1'] == digest:
+                cls._write_cache(cache_file, stat, digest, cached['rows'])
+                return cls(cached['rows'])
+        else:
+            digest = _digest(file_name)
+
+        rows = {}
+        for record in load_records(file_name)[2]:
+            rows.setdefault(record.name, record.to_row()[:len(FIELDS)])  # first entry wins, as when editing
+        cls._write_cache(cache_file, stat, digest, rows)
+        return cls(rows)
+
+    @staticmethod
+    def _read_cache(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+        if not isinstance(cached, dict) or cached.get('version') != CACHE_VERSION or cached.get('fields') != FIELDS:
+            return None
+        return cached
+
+    @staticmethod
+    def _write_cache(cache_file, stat, digest, rows):
+        cached = {
+            'version': CACHE_VERSION,
+            'fields': FIELDS,
+            'stat': (stat.st_mtime_ns, stat.st_size),
+            'sha1': digest,
+            'rows': rows,
+        }
+        try:
+            with atomic_write(cache_file, 'wb') as f:
+                pickle.dump(cached, f, pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            log.warning("Baseline cache not written: %s", e)
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def records(self):
+        """name -> TypeRecord with the baseline values (without unknown children), for diffs."""
+        return {name: TypeRecord.from_row(row + ((),)) for name, row in self.rows.items()}
+
+    def column(self, field):
+        """name -> baseline value of field, built once per field."""
+        column = self._columns.get(field)
+        if column is None:
+            position = FIELDS.index(field)
+            column = {name: row[position] for name, row in self.rows.items()}
+            self._columns[field] = column
+        return column
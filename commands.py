@@ -1,37 +1,118 @@
-from PyQt5.QtWidgets import QUndoCommand, QLineEdit, QComboBox, QTextEdit, QCheckBox
-
-class EditCommand(QUndoCommand):
-    def __init__(self, widget, new_value, description, parent=None):
-        super().__init__(description, parent)
-        self.widget = widget
-        self.new_value = new_value
-        self.old_value = self.get_current_value()
-
-    def get_current_value(self):
-        if isinstance(self.widget, QLineEdit):
-            return self.widget.text()
-        elif isinstance(self.widget, QComboBox):
-            return self.widget.currentText()
-        elif isinstance(self.widget, QTextEdit):
-            return self.widget.toPlainText()
-        elif isinstance(self.widget, QCheckBox):
-            return self.widget.isChecked()
-        return None
-
-    def undo(self):
-        self.set_value(self.old_value)
-
-    def redo(self):
-        self.set_value(self.new_value)
-
-    def set_value(self, value):
-        self.widget.blockSignals(True)
-        if isinstance(self.widget, QLineEdit):
-            self.widget.setText(value)
-        elif isinstance(self.widget, QComboBox):
-            self.widget.setCurrentText(value)
-        elif isinstance(self.widget, QTextEdit):
-            self.widget.setPlainText(value)
-        elif isinstance(self.widget, QCheckBox):
-            self.widget.setChecked(value)
-        self.widget.blockSignals(False)
+from type_record import NUMERIC_FIELDS, LIST_FIELDS
+
+# Record fields the undo log follows; `extra` (unknown XML children) is never edited
+TRACKED_FIELDS = ('name',) + NUMERIC_FIELDS + ('flags', 'category') + LIST_FIELDS
+
+
+def snapshot(record):
+    return tuple(getattr(record, field) for field in TRACKED_FIELDS)
+
+
+class EditCommand:
+    """One undo step: a list of (type name, field, old, new) in the order they happened.
+
+    For 'name' changes the type name is the old name; for the other fields it
+    is the name the type had right after the change, which is what it is
+    called again once every later step has been undone.
+    """
+
+    __slots__ = ('description', 'changes', 'merge_key')
+
+    def __init__(self, description, changes, merge_key=None):
+        self.description = description
+        self.changes = changes
+        self.merge_key = merge_key
+
+
+class UndoLog:
+    """Global undo/redo history of record-level diffs.
+
+    The log keeps a snapshot of every tracked record and diff() compares a
+    record against it after an edit, so every mutation path (details panel,
+    mass edit, ...) is recorded the same way. The history is bounded by the
+    total number of field changes it holds; the oldest steps are dropped first.
+    """
+
+    def __init__(self, max_changes=200000):
+        self.max_changes = max_changes
+        self.undo_stack = []
+        self.redo_stack = []
+        self._size = 0
+        self._shadow = {}
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._size = 0
+        self._shadow.clear()
+
+    def track(self, records):
+        for record in records:
+            self._shadow[record] = snapshot(record)
+
+    def forget(self, record):
+        self._shadow.pop(record, None)
+
+    def diff(self, record):
+        """Changes of record since the last diff (or track), and remember its current state."""
+        current = snapshot(record)
+        previous = self._shadow.get(record)
+        self._shadow[record] = current
+        if previous is None or previous == current:
+            return []
+        changes = []
+        if previous[0] != current[0]:
+            changes.append((previous[0], 'name', previous[0], current[0]))
+        for field, old, new in zip(TRACKED_FIELDS[1:], previous[1:], current[1:]):
+            if old != new:
+                changes.append((record.name, field, old, new))
+        return changes
+
+    def push(self, changes, description='', merge_key=None):
+        """Add a step. A step with the same merge_key as the newest one is folded
+        into it instead, e.g. every tick of one slider drag."""
+        if not changes:
+            return
+        if merge_key is not None and self.undo_stack and not self.redo_stack \
+                and self.undo_stack[-1].merge_key == merge_key:
+            self._merge(self.undo_stack[-1], changes)
+            return
+        self.undo_stack.append(EditCommand(description, changes, merge_key))
+        self._size += len(changes)
+        for command in self.redo_stack:
+            self._size -= len(command.changes)
+        self.redo_stack.clear()
+        # Keep at least the newest step, even if it alone is over the limit
+        while self._size > self.max_changes and len(self.undo_stack) > 1:
+            self._size -= len(self.undo_stack.pop(0).changes)
+
+    def _merge(self, command, changes):
+        # One change per type and field from the first old to the newest value,
+        # so merged steps must not rename. Fields back at their old value drop out.
+        merged = {}
+        for name, field, old, new in command.changes + changes:
+            if (name, field) in merged:
+                old = merged[name, field][2]
+            merged[name, field] = (name, field, old, new)
+        self._size -= len(command.changes)
+        command.changes = [change for change in merged.values() if change[2] != change[3]]
+        self._size += len(command.changes)
+        if not command.changes:
+            self.undo_stack.pop()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def take_undo(self):
+        """Move the newest step to the redo stack and return it; the caller reverts its changes."""
+        command = self.undo_stack.pop()
+        self.redo_stack.append(command)
+        return command
+
+    def take_redo(self):
+        command = self.redo_stack.pop()
+        self.undo_stack.append(command)
+        return command
@@ -0,0 +1,265 @@
+"""Headless batch edits and diffs of types.xml files, without PyQt.
+
+    python -m dayztypes edit types.xml --category weapons --usage Military --nominal x2 --lifetime 150%
+    python -m dayztypes diff output.xml
+    python -m dayztypes merge old/types.xml new/types.xml output.xml
+    python -m dayztypes rules preset.json types.xml
+
+Selection options of different kinds are AND-ed, repeated values of one kind
+are OR-ed, the same as the filter panel. Only the <type> blocks that change
+are rewritten; the file is replaced atomically.
+
+diff compares a types file with Config/types.xml (or --base FILE) and prints
+one line per added (+), removed (-) or changed (~) type as it goes.
+
+merge re-applies the edits of a file (made against the old vanilla types) to
+a new vanilla types file, field by field, and lists the conflicts.
+
+rules applies an economy preset (see economy_rules) to the files.
+"""
+import argparse
+import os
+import sys
+
+import mass_engine
+from baseline_store import BaselineStore
+from economy_rules import apply_operations, apply_rules, load_rules
+from type_diff import ADDED, REMOVED, CHANGED, diff_types, records_by_name
+from type_index import RANGE_FIELDS
+from type_merge import OURS, THEIRS
+from type_record import NUMERIC_FIELDS, FLAG_NAMES, iter_records
+from types_store import TypesStore
+
+
+def parse_operation(spec):
+    """'x2', '/2', '150%' scale, '=3600' sets, 'standard' resets; see mass_engine.parse_operation."""
+    try:
+        return mass_engine.parse_operation(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_range(spec):
+    """'nominal=5:20', 'lifetime=:3600' -> ('nominal', 5, 20); an empty bound is open."""
+    field, _, bounds = spec.partition('=')
+    low, sep, high = bounds.partition(':')
+    if field not in RANGE_FIELDS or not sep:
+        raise argparse.ArgumentTypeError(f"invalid range '{spec}' (use FIELD=LOW:HIGH with FIELD one of {', '.join(RANGE_FIELDS)})")
+    try:
+        return field, int(low) if low else None, int(high) if high else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid range '{spec}'")
+
+
+def split_values(values):
+    """--usage Military,Police --usage Town -> ['Military', 'Police', 'Town']"""
+    return [part for value in values or () for part in value.split(',') if part]
+
+
+def select_records(store, args):
+    filters = {
+        'category': split_values(args.category),
+        'usage': split_values(args.usage),
+        'value': split_values(args.value),
+        'tag': split_values(args.tag),
+        'flags': split_values(args.flag),
+    }
+    ranges = {field: (low, high) for field, low, high in args.range or ()}
+    matched = store.filter_records(filters, ranges, args.name)
+    if matched is None:
+        return list(store.records.values())
+    return [record for record in store.records.values() if record in matched]
+
+
+def is_project(file_name):
+    return os.path.isdir(file_name) or os.path.basename(file_name).lower() == 'cfgeconomycore.xml'
+
+
+def open_store(file_name, args):
+    """TypesStore of a types file, a cfgeconomycore.xml or a folder of types files."""
+    store = TypesStore()
+    if os.path.isdir(file_name):
+        store.load_folder(file_name)
+    elif is_project(file_name):
+        store.load_project(file_name)
+    else:
+        store.load(file_name)
+    for path, reason in store.skipped_files:
+        print(f"warning: skipped {path}: {reason}", file=sys.stderr)
+    for name, kept, ignored in store.duplicate_report():
+        print(f"warning: duplicate type '{name}' in {ignored} ignored, editing the one in {kept}", file=sys.stderr)
+    store.backup_count = args.backups
+    return store
+
+
+def save_store(store, file_name, args, changed):
+    if args.dry_run or (not changed and args.output is None):
+        return
+    if is_project(file_name):
+        store.save_changed_files()
+    else:
+        store.save(args.output or file_name)
+
+
+def edit_file(file_name, args, operations):
+    store = open_store(file_name, args)
+    selected = select_records(store, args)
+    with store.batch():
+        changed = apply_operations(store, selected, operations)
+        for record in changed:
+            store.mark_changed(record.name)
+    print(f"{file_name}: {len(selected)} of {len(store.records)} types selected, {len(changed)} changed")
+    save_store(store, file_name, args, changed)
+
+
+def check_output(args):
+    if args.output is not None and (len(args.files) > 1 or any(is_project(name) for name in args.files)):
+        print("--output needs a single types file", file=sys.stderr)
+        return False
+    return True
+
+
+def command_edit(args):
+    operations = [(field, getattr(args, field)) for field in NUMERIC_FIELDS if getattr(args, field) is not None]
+    if not check_output(args):
+        return 2
+    for flag in split_values(args.flag):
+        if flag not in FLAG_NAMES:
+            print(f"unknown flag '{flag}' (one of {', '.join(FLAG_NAMES)})", file=sys.stderr)
+            return 2
+    status = 0
+    for file_name in args.files:
+        try:
+            edit_file(file_name, args, operations)
+        except (OSError, SyntaxError, ValueError) as e:  # ET.ParseError is a SyntaxError
+            print(f"{file_name}: {e}", file=sys.stderr)
+            status = 1
+    return status
+
+
+def command_rules(args):
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as e:
+        print(f"{args.rules}: {e}", file=sys.stderr)
+        return 2
+    if not check_output(args):
+        return 2
+    status = 0
+    for file_name in args.files:
+        try:
+            store = open_store(file_name, args)
+            report = apply_rules(store, rules)
+            for rule, selected, changed in report:
+                print(f"{file_name}: {rule.name}: {selected} selected, {changed} changed")
+            save_store(store, file_name, args, store.dirty_records)
+        except (OSError, SyntaxError, ValueError) as e:
+            print(f"{file_name}: {e}", file=sys.stderr)
+            status = 1
+    return status
+
+
+def command_diff(args):
+    try:
+        if args.base:
+            with open(args.base, 'rb') as f:
+                base = records_by_name(iter_records(f))
+        else:
+            base = BaselineStore.load().records()
+        counts = {ADDED: 0, REMOVED: 0, CHANGED: 0}
+        # The compared file is parsed while the diff is printed, one <type> at a time
+        with open(args.file, 'rb') as f:
+            for diff in diff_types(base, iter_records(f)):
+                counts[diff.kind] += 1
+                if not args.summary:
+                    print(diff)
+    except (OSError, SyntaxError) as e:
+        print(f"{e}", file=sys.stderr)
+        return 2
+    print(f"{counts[ADDED]} added, {counts[REMOVED]} removed, {counts[CHANGED]} changed")
+    return 1 if any(counts.values()) else 0
+
+
+def command_merge(args):
+    store = TypesStore()
+    try:
+        store.load(args.ours)
+        with open(args.base, 'rb') as f:
+            base = records_by_name(iter_records(f))
+        before = set(store.records)
+        with open(args.theirs, 'rb') as f:
+            conflicts = store.merge_update(base, iter_records(f), args.prefer)
+        for conflict in conflicts:
+            print(f"conflict: {conflict}")
+        after = set(store.records)
+        print(f"{args.ours}: {len(after - before)} added, {len(before - after)} removed, "
+              f"{len(store.dirty_records)} changed, {len(conflicts)} conflicts")
+        if not args.dry_run:
+            store.backup_count = args.backups
+            store.save(args.output or args.ours)
+    except (OSError, SyntaxError) as e:
+        print(f"{e}", file=sys.stderr)
+        return 2
+    return 1 if conflicts else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='dayztypes', description="Batch edits of DayZ types.xml files.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    edit = commands.add_parser('edit', help="scale or set numeric fields of the selected types")
+    edit.add_argument('files', nargs='+', metavar='FILE',
+                      help="types file, cfgeconomycore.xml (every types file of the mission) or a folder of types files")
+    select = edit.add_argument_group("selection (all types if none given)")
+    select.add_argument('--category', action='append', metavar='NAME')
+    select.add_argument('--usage', action='append', metavar='NAME')
+    select.add_argument('--value', action='append', metavar='NAME')
+    select.add_argument('--tag', action='append', metavar='NAME')
+    select.add_argument('--flag', action='append', metavar='NAME', help="flag that must be set")
+    select.add_argument('--name', metavar='TEXT', help="name contains TEXT (prefix for 1-2 characters)")
+    select.add_argument('--range', action='append', type=parse_range, metavar='FIELD=LOW:HIGH')
+    change = edit.add_argument_group("operations (x2, /2, 150%%, =N or standard)")
+    for field in NUMERIC_FIELDS:
+        change.add_argument(f'--{field}', type=parse_operation, metavar='OP')
+    edit.add_argument('-o', '--output', metavar='FILE', help="write here instead of in place")
+    edit.add_argument('--backups', type=int, default=0, metavar='N', help="keep N rotated .bak copies")
+    edit.add_argument('--dry-run', action='store_true', help="only report what would change")
+    edit.set_defaults(handler=command_edit)
+
+    rules = commands.add_parser('rules', help="apply an economy preset of rules (JSON or YAML)")
+    rules.add_argument('rules', metavar='RULES', help="rules file, see economy_rules for the format")
+    rules.add_argument('files', nargs='+', metavar='FILE',
+                       help="types file, cfgeconomycore.xml (every types file of the mission) or a folder of types files")
+    rules.add_argument('-o', '--output', metavar='FILE', help="write here instead of in place")
+    rules.add_argument('--backups', type=int, default=0, metavar='N', help="keep N rotated .bak copies")
+    rules.add_argument('--dry-run', action='store_true', help="only report what would change")
+    rules.set_defaults(handler=command_rules)
+
+    diff = commands.add_parser('diff', help="list the types added, removed or changed against a base file",
+                               description="Exit status 0 if the files match, 1 if they differ, 2 on errors.")
+    diff.add_argument('file', metavar='FILE', help="types file to compare")
+    diff.add_argument('--base', metavar='FILE', help="compare against this file instead of Config/types.xml")
+    diff.add_argument('--summary', action='store_true', help="only print the counts")
+    diff.set_defaults(handler=command_diff)
+
+    merge = commands.add_parser('merge', help="re-apply the edits of a file to a new vanilla types file",
+                                description="Exit status 0 without conflicts, 1 with conflicts, 2 on errors.")
+    merge.add_argument('base', metavar='OLD', help="the vanilla types file the edits were made against")
+    merge.add_argument('theirs', metavar='NEW', help="the new vanilla types file")
+    merge.add_argument('ours', metavar='FILE', help="the edited types file, merged in place")
+    merge.add_argument('--prefer', choices=(OURS, THEIRS), default=OURS,
+                       help="side whose value wins a conflict (default: ours)")
+    merge.add_argument('-o', '--output', metavar='FILE', help="write here instead of in place")
+    merge.add_argument('--backups', type=int, default=0, metavar='N', help="keep N rotated .bak copies")
+    merge.add_argument('--dry-run', action='store_true', help="only report what would change")
+    merge.set_defaults(handler=command_merge)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
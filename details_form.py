@@ -0,0 +1,187 @@
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QComboBox, QCheckBox, QPushButton
+)
+from PyQt5.QtCore import Qt
+
+from type_record import NUMERIC_FIELDS, FLAG_NAMES
+
+
+def set_combo_text(combo, text):
+    """Select text; values missing from the options are added."""
+    position = combo.findText(text)
+    if position < 0 and text:
+        combo.addItem(text)
+        position = combo.count() - 1
+    combo.setCurrentIndex(max(position, 0))
+
+
+class ListRow(QWidget):
+    """One usage/value/tag row: label, combo box and a Remove button."""
+
+    def __init__(self, group, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        self.combo = QComboBox(self)
+        self.combo.addItems(group.options)
+        self.combo.setFixedHeight(30)
+
+        remove_button = QPushButton('Remove', self)
+        remove_button.setFixedHeight(30)
+        remove_button.clicked.connect(lambda: group.remove_row(self))
+
+        layout.addWidget(QLabel(f"{group.field.capitalize()}:", self))
+        layout.addWidget(self.combo)
+        layout.addWidget(remove_button)
+
+
+class ListGroup(QWidget):
+    """The rows of one list field. Rows are created when a record needs more
+    of them than ever before and are hidden, not deleted, when it needs fewer."""
+
+    def __init__(self, field, options, parent=None):
+        super().__init__(parent)
+        self.field = field
+        self.options = options
+        self.rows = []
+        self.count = 0
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+    def texts(self):
+        return [row.combo.currentText() for row in self.rows[:self.count]]
+
+    def set_texts(self, texts):
+        while len(self.rows) < len(texts):
+            row = ListRow(self, self)
+            self.layout().addWidget(row)
+            self.rows.append(row)
+        for row, text in zip(self.rows, texts):
+            set_combo_text(row.combo, text)
+            row.show()
+        for row in self.rows[len(texts):]:
+            row.hide()
+        self.count = len(texts)
+
+    def add_row(self, text=''):
+        print(f"Adding {self.field} field: {text}")  # Debug info
+        self.set_texts(self.texts() + [text])
+
+    def remove_row(self, row):
+        print(f"Removing {self.field} field")  # Debug info
+        texts = self.texts()
+        del texts[self.rows.index(row)]
+        self.set_texts(texts)
+
+
+class DetailsForm(QWidget):
+    """The details panel, built once. bind() fills it from a record and hides
+    the fields the record does not have, so switching items creates no widgets
+    (except list rows beyond the most seen so far)."""
+
+    def __init__(self, xml_logic, parent=None):
+        super().__init__(parent)
+        self.xml_logic = xml_logic
+        self.record = None
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setAlignment(Qt.AlignTop)
+        self.setLayout(layout)
+
+        # Which types file of the project the item comes from
+        self.file_label = QLabel(self)
+        self.file_label.setWordWrap(True)
+        layout.addWidget(self.file_label)
+
+        layout.addWidget(QLabel('Name:', self))
+        self.name_edit = QLineEdit(self)
+        self.name_edit.setFixedHeight(30)
+        layout.addWidget(self.name_edit)
+
+        # field -> (label, edit); fields the record lacks are hidden, not removed
+        self.numeric_rows = {}
+        for field in NUMERIC_FIELDS:
+            label = QLabel(f"{field.capitalize()}:", self)
+            edit = QLineEdit(self)
+            edit.setFixedHeight(30)
+            layout.addWidget(label)
+            layout.addWidget(edit)
+            self.numeric_rows[field] = (label, edit)
+
+        self.flags_label = QLabel('Flags:', self)
+        layout.addWidget(self.flags_label)
+        self.flag_checkboxes = {}
+        for flag in FLAG_NAMES:
+            checkbox = QCheckBox(flag, self)
+            layout.addWidget(checkbox)
+            self.flag_checkboxes[flag] = checkbox
+
+        self.category_label = QLabel('Category:', self)
+        self.category_combo = QComboBox(self)
+        self.category_combo.addItems(xml_logic.category_options)
+        self.category_combo.setFixedHeight(30)
+        layout.addWidget(self.category_label)
+        layout.addWidget(self.category_combo)
+
+        self.groups = {
+            'usage': ListGroup('usage', xml_logic.usage_options, self),
+            'value': ListGroup('value', xml_logic.value_options, self),
+            'tag': ListGroup('tag', xml_logic.tag_options, self),
+        }
+        for group in self.groups.values():
+            layout.addWidget(group)
+
+        for field in ('usage', 'value', 'tag'):
+            add_button = QPushButton(f'Add {field.capitalize()}', self)
+            add_button.clicked.connect(lambda checked, group=self.groups[field]: group.add_row())
+            layout.addWidget(add_button)
+
+        self.hide()
+
+    def bind(self, record):
+        """Show record; returns {field: widget} for the fields it has (list fields map to their ListGroup)."""
+        self.record = record
+        self.setUpdatesEnabled(False)
+        widgets = {'name': self.name_edit}
+        self.file_label.setVisible(self.xml_logic.project)
+        if self.xml_logic.project:
+            self.file_label.setText(f"File: {self.xml_logic.file_of(record)}")
+        self.name_edit.setText(record.name)
+
+        for field, (label, edit) in self.numeric_rows.items():
+            value = getattr(record, field)
+            label.setVisible(value is not None)
+            edit.setVisible(value is not None)
+            if value is not None:
+                edit.setText(str(value))
+                widgets[field] = edit
+
+        has_flags = record.flags is not None
+        self.flags_label.setVisible(has_flags)
+        for flag, checkbox in self.flag_checkboxes.items():
+            checkbox.setVisible(has_flags)
+            if has_flags:
+                checkbox.setChecked(record.get_flag(flag))
+                widgets[flag] = checkbox
+
+        has_category = record.category is not None
+        self.category_label.setVisible(has_category)
+        self.category_combo.setVisible(has_category)
+        if has_category:
+            set_combo_text(self.category_combo, record.category)
+            widgets['category'] = self.category_combo
+
+        for field, group in self.groups.items():
+            group.set_texts(getattr(record, field))
+            widgets[field] = group
+
+        self.show()
+        self.setUpdatesEnabled(True)
+        return widgets
+
+    def unbind(self):
+        self.record = None
+        self.hide()
@@ -0,0 +1,128 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QListWidget, QListWidgetItem,
+    QFileDialog, QMessageBox
+)
+from PyQt5.QtCore import Qt, QTimer
+from baseline_store import BaselineStore
+from type_diff import ADDED, REMOVED, CHANGED, diff_types, records_by_name
+from type_record import load_records
+
+# Diffs added to the list per timer tick, so a large diff never blocks the window
+DIFF_CHUNK = 200
+
+
+class DiffDialog(QDialog):
+    """Differences between the loaded types and Config/types.xml or another file.
+
+    The diff is consumed from the diff_types() generator a chunk at a time;
+    clicking a line shows that type, "Check in list" checks every added or
+    changed type for the Mass Edit.
+    """
+
+    def __init__(self, xml_logic, parent=None):
+        super().__init__(parent)
+        self.xml_logic = xml_logic
+        self.parent = parent
+        self.diffs = None
+        self.counts = {}
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.add_next_chunk)
+        self.initUI()
+
+    def initUI(self):
+        self.setWindowTitle("Diff")
+        self.setGeometry(150, 150, 600, 500)
+
+        layout = QVBoxLayout()
+        source_layout = QHBoxLayout()
+        source_layout.addWidget(QLabel("Compare with:", self))
+        self.base_combo = QComboBox(self)
+        self.base_combo.addItems(["Standard (Config/types.xml)", "Other file..."])
+        source_layout.addWidget(self.base_combo, 1)
+        compare_button = QPushButton("Compare", self)
+        compare_button.clicked.connect(self.compare)
+        source_layout.addWidget(compare_button)
+        layout.addLayout(source_layout)
+
+        self.summary_label = QLabel(self)
+        layout.addWidget(self.summary_label)
+
+        self.diff_list = QListWidget(self)
+        self.diff_list.setUniformItemSizes(True)
+        self.diff_list.itemClicked.connect(self.show_item)
+        layout.addWidget(self.diff_list)
+
+        button_layout = QHBoxLayout()
+        check_button = QPushButton("Check in list", self)
+        check_button.setToolTip("Check the added and changed types in the main list")
+        check_button.clicked.connect(self.check_in_list)
+        button_layout.addWidget(check_button)
+        close_button = QPushButton("Close", self)
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def load_base(self):
+        """name -> TypeRecord of the side to compare with, or None if cancelled."""
+        if self.base_combo.currentIndex() == 0:
+            return BaselineStore.load().records()
+        file_name, _ = QFileDialog.getOpenFileName(self, "Compare with", "", "XML Files (*.xml);;All Files (*)")
+        if not file_name:
+            return None
+        return records_by_name(load_records(file_name)[2])
+
+    def compare(self):
+        if self.xml_logic.file_name is None or self.xml_logic.is_loading():
+            return
+        try:
+            base = self.load_base()
+        except (OSError, SyntaxError) as e:
+            QMessageBox.critical(self, "Error", f"Could not load the file to compare with:\n{e}")
+            return
+        if base is None:
+            return
+        self.xml_logic.saveCurrentItemDetails()
+        self.diff_list.clear()
+        self.counts = {ADDED: 0, REMOVED: 0, CHANGED: 0}
+        # A snapshot of the records, edits made while the list fills don't disturb the generator
+        self.diffs = diff_types(base, list(self.xml_logic.records.values()))
+        self.update_summary("Comparing...")
+        self.timer.start(0)
+
+    def add_next_chunk(self):
+        for _ in range(DIFF_CHUNK):
+            diff = next(self.diffs, None)
+            if diff is None:
+                self.timer.stop()
+                self.diffs = None
+                self.update_summary()
+                return
+            self.counts[diff.kind] += 1
+            item = QListWidgetItem(str(diff))
+            item.setData(Qt.UserRole, diff.name)
+            item.setData(Qt.UserRole + 1, diff.kind)
+            self.diff_list.addItem(item)
+        self.update_summary("Comparing...")
+
+    def update_summary(self, status=""):
+        text = (f"{self.counts[ADDED]} added, {self.counts[REMOVED]} removed, "
+                f"{self.counts[CHANGED]} changed")
+        self.summary_label.setText(f"{text} {status}".strip())
+
+    def show_item(self, item):
+        name = item.data(Qt.UserRole)
+        if name in self.xml_logic.records:  # removed types only exist in the base
+            self.xml_logic.displayItemDetails(name)
+
+    def check_in_list(self):
+        names = [self.diff_list.item(row).data(Qt.UserRole) for row in range(self.diff_list.count())
+                 if self.diff_list.item(row).data(Qt.UserRole + 1) != REMOVED]
+        self.parent.list_model.set_checked(names, True)
+        print(f"Checked {len(names)} differing items")  # Debug info
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.diffs = None
+        super().closeEvent(event)
@@ -0,0 +1,26 @@
+import os
+import xml.etree.ElementTree as ET
+
+
+def types_files(core_file):
+    """Types files of the mission that cfgeconomycore.xml belongs to, in load order.
+
+    db/types.xml is always loaded by the Central Economy, so it comes first
+    when present; then every <file type="types"> of the <ce folder="..."> blocks.
+    Paths are resolved against the mission folder (where cfgeconomycore.xml is).
+    """
+    mission = os.path.dirname(os.path.abspath(core_file))
+    files = []
+    default = os.path.join(mission, 'db', 'types.xml')
+    if os.path.exists(default):
+        files.append(default)
+    root = ET.parse(core_file).getroot()
+    for ce in root.iter('ce'):
+        folder = ce.get('folder', '')
+        for element in ce.findall('file'):
+            if element.get('type') != 'types' or not element.get('name'):
+                continue
+            path = os.path.normpath(os.path.join(mission, folder, element.get('name')))
+            if path not in files:
+                files.append(path)
+    return files
@@ -0,0 +1,198 @@
+"""Declarative economy presets: rules that select types and transform their numbers.
+
+A rules file is JSON (or YAML, if PyYAML is installed) with a list of rules,
+applied in order, each to the types it selects at that point:
+
+    {"rules": [
+        {"name": "Military Tier4 scarcer",
+         "select": {"usage": ["Military"], "value": ["Tier4"]},
+         "apply": {"nominal": "x0.5", "min": "x0.5"},
+         "clamp": {"nominal": [1, null]}},
+        {"name": "Old rifles last longer",
+         "select": {"category": "weapons", "name": "^(AK|M4)", "range": {"lifetime": [null, 14400]}},
+         "apply": {"lifetime": "x1.25"},
+         "round": {"lifetime": 60}}
+    ]}
+
+select takes category/usage/value/tag/flags (a name or a list, OR within a
+key, AND across keys, like the filter panel), name (a regular expression
+searched in the type name) and range ({field: [low, high]}). apply takes the
+operations of the command line (x2, /2, 150%, =N or a number, standard);
+round gives a step per field and clamp [low, high] per field, both applied
+after the operations. Every rule then keeps min <= nominal.
+"""
+import json
+import os
+import re
+
+import mass_engine
+from type_index import RANGE_FIELDS
+from type_record import NUMERIC_FIELDS, FLAG_NAMES, is_count
+
+FACETS = ('category', 'usage', 'value', 'tag', 'flags')
+RULE_KEYS = ('name', 'select', 'apply', 'round', 'clamp')
+
+
+def _names(value, what):
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    raise ValueError(f"{what}: expected a name or a list of names")
+
+
+def _bound(value, what):
+    if value is None or (isinstance(value, int) and not isinstance(value, bool)):
+        return value
+    raise ValueError(f"{what}: expected an integer or null")
+
+
+def _pair(value, what):
+    if not isinstance(value, list) or len(value) != 2:
+        raise ValueError(f"{what}: expected [low, high]")
+    return _bound(value[0], what), _bound(value[1], what)
+
+
+def _mapping(data, key, what):
+    value = data.get(key, {})
+    if not isinstance(value, dict):
+        raise ValueError(f"{what}: {key} must be an object")
+    return value
+
+
+def _numeric_field(field, what, fields=NUMERIC_FIELDS):
+    if field not in fields:
+        raise ValueError(f"{what}: unknown field '{field}' (one of {', '.join(fields)})")
+    return field
+
+
+class Rule:
+    """One parsed rule; see the module docstring for the format."""
+
+    def __init__(self, name, filters=None, ranges=None, pattern=None, operations=(), steps=(), clamps=()):
+        self.name = name
+        self.filters = filters or {}
+        self.ranges = ranges or {}
+        self.pattern = pattern
+        self.operations = list(operations)  # (field, (kind, argument))
+        self.steps = list(steps)  # (field, step)
+        self.clamps = list(clamps)  # (field, low, high)
+
+    @classmethod
+    def from_dict(cls, data, number=1):
+        name = data.get('name', f"rule {number}") if isinstance(data, dict) else f"rule {number}"
+        what = f"rule '{name}'"
+        if not isinstance(data, dict):
+            raise ValueError(f"{what}: expected an object")
+        unknown = set(data) - set(RULE_KEYS)
+        if unknown:
+            raise ValueError(f"{what}: unknown keys {', '.join(sorted(unknown))}")
+
+        select = _mapping(data, 'select', what)
+        unknown = set(select) - set(FACETS) - {'name', 'range'}
+        if unknown:
+            raise ValueError(f"{what}: unknown selection keys {', '.join(sorted(unknown))}")
+        filters = {facet: _names(select[facet], f"{what} {facet}") for facet in FACETS if facet in select}
+        for flag in filters.get('flags', ()):
+            if flag not in FLAG_NAMES:
+                raise ValueError(f"{what}: unknown flag '{flag}' (one of {', '.join(FLAG_NAMES)})")
+        ranges = {}
+        for field, bounds in _mapping(select, 'range', what).items():
+            ranges[_numeric_field(field, f"{what} range", RANGE_FIELDS)] = _pair(bounds, f"{what} range {field}")
+        pattern = None
+        if 'name' in select:
+            try:
+                pattern = re.compile(select['name'])
+            except (re.error, TypeError) as e:
+                raise ValueError(f"{what}: invalid name pattern: {e}") from None
+
+        operations = []
+        for field, spec in _mapping(data, 'apply', what).items():
+            try:
+                operations.append((_numeric_field(field, what), mass_engine.parse_operation(spec)))
+            except ValueError as e:
+                raise ValueError(f"{what} {field}: {e}") from None
+        steps = []
+        for field, step in _mapping(data, 'round', what).items():
+            if not isinstance(step, int) or isinstance(step, bool) or step <= 0:
+                raise ValueError(f"{what} round {field}: expected a positive integer step")
+            steps.append((_numeric_field(field, what), step))
+        clamps = [(_numeric_field(field, what),) + _pair(bounds, f"{what} clamp {field}")
+                  for field, bounds in _mapping(data, 'clamp', what).items()]
+        return cls(name, filters, ranges, pattern, operations, steps, clamps)
+
+    def select(self, store):
+        """Records of the store the rule applies to, in store order."""
+        matched = store.filter_records(self.filters, self.ranges)
+        records = store.records.values()
+        if matched is not None:
+            records = [record for record in records if record in matched]
+        if self.pattern is not None:
+            search = self.pattern.search
+            records = [record for record in records if search(record.name)]
+        return list(records)
+
+    def apply(self, store, records):
+        """Transform the records; returns the set of changed ones."""
+        changed = apply_operations(store, records, self.operations)
+        for field, step in self.steps:
+            changed.update(mass_engine.round_column(records, field, step))
+        for field, low, high in self.clamps:
+            changed.update(mass_engine.clamp_column(records, field, low, high))
+        # The economy never spawns more than nominal, a larger min is cut down
+        for record in records:
+            if is_count(record.min) and is_count(record.nominal) and record.min > record.nominal:
+                record.min = record.nominal
+                changed.add(record)
+        return changed
+
+
+def apply_operations(store, records, operations):
+    """Run (field, (kind, argument)) operations over records; returns the set of changed records."""
+    changed = set()
+    for field, (kind, argument) in operations:
+        if kind == 'scale':
+            changed.update(mass_engine.scale_column(records, field, argument))
+        elif kind == 'standard':
+            changed.update(mass_engine.reset_to_baseline(records, field, store.standard_values(field)))
+        else:
+            changed.update(mass_engine.set_column(records, field, argument))
+    return changed
+
+
+def parse_rules(data):
+    """Rules from the loaded JSON/YAML: {"rules": [...]} or just the list."""
+    if isinstance(data, dict) and set(data) == {'rules'}:
+        data = data['rules']
+    if not isinstance(data, list):
+        raise ValueError("expected a list of rules or {\"rules\": [...]}")
+    return [Rule.from_dict(rule, number) for number, rule in enumerate(data, 1)]
+
+
+def load_rules(file_name):
+    with open(file_name, encoding='utf-8') as f:
+        if os.path.splitext(file_name)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML rules need PyYAML (pip install pyyaml), or use JSON") from None
+            try:
+                data = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"invalid YAML: {e}") from None
+            return parse_rules(data)
+        return parse_rules(json.load(f))  # json.JSONDecodeError is a ValueError
+
+
+def apply_rules(store, rules):
+    """Run the rules in order over the store as one batch (one undo step, one list
+    refresh). Returns (rule, selected, changed) counts per rule."""
+    report = []
+    with store.batch():
+        for rule in rules:
+            records = rule.select(store)
+            changed = rule.apply(store, records)
+            for record in changed:
+                store.mark_changed(record.name)  # later rules select on the updated index
+            report.append((rule, len(records), len(changed)))
+    return report
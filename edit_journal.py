@@ -0,0 +1,118 @@
+import logging
+import os
+import pickle
+import queue
+import struct
+import threading
+
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_VERSION = 1
+# The writer fsyncs at most this often; edits made meanwhile share one fsync
+FSYNC_INTERVAL = 0.5
+
+_SIZE = struct.Struct('<I')
+log = logging.getLogger(__name__)
+
+
+def _frame(value):
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return _SIZE.pack(len(data)) + data
+
+
+def read_journal(path, stamp):
+    """Entries journaled against the files as they are now (stamp), in order.
+
+    [] if there is no journal or it was written for other file contents. A
+    frame cut off by a crash ends the journal; the ones before it are kept.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    frames = []
+    position = 0
+    while position + _SIZE.size <= len(data):
+        (size,) = _SIZE.unpack_from(data, position)
+        start = position + _SIZE.size
+        end = start + size
+        if end > len(data):
+            break
+        try:
+            frames.append(pickle.loads(data[start:end]))
+        except (pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            break
+        position = end
+    if not frames or frames[0] != ('journal', JOURNAL_VERSION, stamp):
+        return []
+    return [entry for batch in frames[1:] for entry in batch]
+
+
+class EditJournal:
+    """Append-only journal of the edits made since the last save, for crash recovery.
+
+    append() only queues a batch of entries; a background thread pickles it,
+    appends it to the file and fsyncs, batching whatever arrived within
+    FSYNC_INTERVAL into one fsync. The file starts with a header holding the
+    stamp (path, size, mtime) of the edited files, so a journal is only
+    replayed against the files it was written for. truncate() restarts it
+    after a save. If the file can't be written (disk full, read-only), the
+    writer stops, `error` holds the OSError and later calls do nothing.
+    """
+
+    def __init__(self, path, stamp):
+        self.path = path
+        self.error = None
+        self._queue = queue.Queue()
+        self._wake = threading.Event()
+        self._queue.put(('reset', stamp))
+        self._thread = threading.Thread(target=self._run, name='edit-journal', daemon=True)
+        self._thread.start()
+
+    def append(self, entries):
+        if self.error is None:
+            self._queue.put(('append', entries))
+
+    def truncate(self, stamp):
+        if self.error is None:
+            self._queue.put(('reset', stamp))
+
+    def close(self, remove=False):
+        """Write what is queued and stop; remove the file if nothing is left unsaved."""
+        self._queue.put(('close', remove))
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        remove = False
+        try:
+            with open(self.path, 'wb') as f:
+                closing = False
+                while not closing:
+                    commands = [self._queue.get()]
+                    while True:
+                        try:
+                            commands.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    for command, argument in commands:
+                        if command == 'append':
+                            f.write(_frame(argument))
+                        elif command == 'reset':
+                            f.seek(0)
+                            f.truncate()
+                            f.write(_frame(('journal', JOURNAL_VERSION, argument)))
+                        else:
+                            closing, remove = True, argument
+                    f.flush()
+                    os.fsync(f.fileno())
+                    if not closing:
+                        self._wake.wait(FSYNC_INTERVAL)
+            if remove:
+                os.remove(self.path)
+        except OSError as e:
+            self.error = e
+            log.warning("Edit journal stopped: %s", e)
+            # Nothing reads the queue anymore, let go of what is still in it
+            while not self._queue.empty():
+                self._queue.get_nowait()
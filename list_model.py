@@ -0,0 +1,165 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+
+
+class TypeListModel(QAbstractListModel):
+    """Names of the loaded types, with check state kept in the model."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._names = []
+        self._rows = {}
+        self._checked = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self._names[index.row()]
+        if role == Qt.DisplayRole:
+            return name
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if name in self._checked else Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        name = self._names[index.row()]
+        if value == Qt.Checked:
+            self._checked.add(name)
+        else:
+            self._checked.discard(name)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def set_names(self, names):
+        self.beginResetModel()
+        self._names = list(names)
+        self._rows = {name: row for row, name in enumerate(self._names)}
+        # Keep the check marks of items that survived the reload
+        self._checked &= set(self._rows)
+        self.endResetModel()
+
+    def name_at(self, row):
+        return self._names[row]
+
+    def names(self):
+        return self._names
+
+    def index_of(self, name):
+        row = self._rows.get(name)
+        if row is None:
+            return QModelIndex()
+        return self.index(row, 0)
+
+    def refresh_names(self, names):
+        """Emit one dataChanged covering the rows of the given names."""
+        rows = [self._rows[name] for name in names if name in self._rows]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), 0))
+
+    def rename(self, old_name, new_name):
+        row = self._rows.pop(old_name, None)
+        if row is None:
+            return
+        self._names[row] = new_name
+        self._rows[new_name] = row
+        if old_name in self._checked:
+            self._checked.discard(old_name)
+            self._checked.add(new_name)
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index)
+
+    def append_name(self, name):
+        row = len(self._names)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._names.append(name)
+        self._rows[name] = row
+        self.endInsertRows()
+
+    def append_names(self, names):
+        if not names:
+            return
+        first = len(self._names)
+        self.beginInsertRows(QModelIndex(), first, first + len(names) - 1)
+        for row, name in enumerate(names, first):
+            self._names.append(name)
+            self._rows[name] = row
+        self.endInsertRows()
+
+    def remove_name(self, name):
+        row = self._rows.get(name)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._names[row]
+        del self._rows[name]
+        for row in range(row, len(self._names)):  # only the rows below moved up
+            self._rows[self._names[row]] = row
+        self._checked.discard(name)
+        self.endRemoveRows()
+
+    def remove_names(self, names):
+        """Remove many rows with one model reset, instead of shifting the rows once per name."""
+        names = {name for name in names if name in self._rows}
+        if len(names) <= 1:
+            for name in names:
+                self.remove_name(name)
+            return
+        self.beginResetModel()
+        self._names = [name for name in self._names if name not in names]
+        self._rows = {name: row for row, name in enumerate(self._names)}
+        self._checked -= names
+        self.endResetModel()
+
+    def is_checked(self, name):
+        return name in self._checked
+
+    def set_checked(self, names, checked):
+        names = [name for name in names if name in self._rows]
+        if not names:
+            return
+        if checked:
+            self._checked.update(names)
+        else:
+            self._checked.difference_update(names)
+        self.refresh_names(names)
+
+    def checked_names(self):
+        """Checked names in list order."""
+        return [name for name in self._names if name in self._checked]
+
+
+class TypeFilterProxyModel(QSortFilterProxyModel):
+    """Hides rows outside the current filter result, without rebuilding the source model."""
+
+    def __init__(self, xml_logic, parent=None):
+        super().__init__(parent)
+        self.xml_logic = xml_logic
+        self._visible = None
+
+    def set_visible_records(self, records):
+        """records: set of TypeRecord to show, or None to show everything."""
+        self._visible = records
+        self.invalidateFilter()
+
+    def accepts_name(self, name):
+        if self._visible is None:
+            return True
+        # Records, not names, so a rename does not drop a row out of the filter
+        return self.xml_logic.records.get(name) in self._visible
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.accepts_name(self.sourceModel().name_at(source_row))
+
+    def visible_names(self):
+        return [name for name in self.sourceModel().names() if self.accepts_name(name)]
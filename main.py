@@ -1,15 +1,62 @@
+import logging
+import multiprocessing
 import sys
-from PyQt5.QtWidgets import QApplication
-from ui import XMLViewer
-from qt_material import apply_stylesheet
-import qtawesome as qta  # Импортируем библиотеку QtAwesome
-from PyQt5.QtGui import QFont
+import time
 
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    viewer = XMLViewer()
+
+class StartupProfile:
+    """Timing of each startup step, printed with --profile-startup."""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.steps = []
+        self.start = self.last = time.perf_counter()
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, now - self.last))
+        self.last = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("Startup profile:")
+        for step, seconds in self.steps:
+            print(f"  {step:<32} {seconds * 1000:8.1f} ms")
+        print(f"  {'total':<32} {(self.last - self.start) * 1000:8.1f} ms")
+
+
+def apply_theme(app, profile):
+    # qt_material is slow to import and to build its stylesheet, so it runs after the window is shown
+    profile.mark("icons (qtawesome)")  # the viewer's deferred icon loading ran just before
+    from qt_material import apply_stylesheet
+    profile.mark("import qt_material")
     apply_stylesheet(app, theme='light_amber.xml')
+    profile.mark("apply stylesheet")
+    profile.report()
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()  # the folder/project loader starts worker processes, also in the frozen build
+    # The core modules log what they do; the GUI shows it on its console like its own debug prints
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    profile = StartupProfile('--profile-startup' in sys.argv)
+    argv = [arg for arg in sys.argv if arg != '--profile-startup']
+
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtGui import QFont
+    from PyQt5.QtCore import QTimer
+    profile.mark("import PyQt5")
+    from ui import XMLViewer
+    profile.mark("import ui")
+
+    app = QApplication(argv)
     font = QFont("Source Sans Pro", 8)  # Уменьшаем размер шрифта
     app.setFont(font)
+    profile.mark("QApplication")
+    viewer = XMLViewer()
+    profile.mark("XMLViewer")
     viewer.show()
+    profile.mark("show")
+    QTimer.singleShot(0, lambda: apply_theme(app, profile))
     sys.exit(app.exec_())
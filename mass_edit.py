@@ -1,42 +1,46 @@
 from PyQt5.QtCore import QThread, pyqtSignal
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QCheckBox, QSlider, QComboBox, QScrollArea, QFrame, QMessageBox, QWidget, QProgressBar
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QCheckBox, QSlider, QComboBox, QScrollArea, QFrame, QWidget, QProgressBar
 from PyQt5.QtGui import QIcon
 from PyQt5.QtCore import Qt
 import os
-import xml.etree.ElementTree as ET
+from type_record import is_count, parse_int
+import mass_engine
 
 class LoadDataThread(QThread):
     data_loaded = pyqtSignal(dict)
     progress = pyqtSignal(int)  # Add a signal for progress
 
-    def __init__(self, xml_logic, parameters):
+    def __init__(self, records, parameters):
         super().__init__()
-        self.xml_logic = xml_logic
+        # Snapshot taken on the GUI thread, the worker never touches widgets
+        self.records = list(records)
         self.parameters = parameters
 
     def run(self):
-        initial_values = {}
-        total_items = len(self.xml_logic.get_selected_items())
-        processed_items = 0
-
-        for param in self.parameters:
-            initial_values[param] = self._get_initial_values(param)
-            processed_items += 1
-            progress = int((processed_items / total_items) * 100)
-            self.progress.emit(progress)  # Emit progress
-
+        # One pass over the records fills every parameter column, aligned with self.records
+        initial_values = {param: [] for param in self.parameters}
+        columns = [(param, initial_values[param]) for param in self.parameters]
+        total_items = len(self.records)
+        last_progress = -1
+
+        for processed_items, record in enumerate(self.records, 1):
+            for param, column in columns:
+                column.append(getattr(record, param))
+            progress = processed_items * 100 // total_items
+            if progress != last_progress:
+                self.progress.emit(progress)  # Emit progress
+                last_progress = progress
+
+        if not total_items:
+            self.progress.emit(100)
         self.data_loaded.emit(initial_values)
 
-    def _get_initial_values(self, param):
-        selected_items = self.xml_logic.get_selected_items()
-        initial_values = [int(item.find(param).text) for item in selected_items if item.find(param) is not None and item.find(param).text.isdigit()]
-        return initial_values
-
 class MassEditDialog(QDialog):
     def __init__(self, xml_logic, parent=None):
         super().__init__(parent)
         self.xml_logic = xml_logic
         self.parent = parent
+        self.selected_records = []
         self.initial_values = {}
         self.parameters = ['nominal', 'min', 'lifetime', 'restock']
         self.lifetime_slider_value = parent.lifetime_slider_value
@@ -68,7 +72,9 @@ class MassEditDialog(QDialog):
         self.setLayout(layout)
 
     def load_initial_values(self):
-        self.thread = LoadDataThread(self.xml_logic, self.parameters)
+        # Slider percentages apply to the items selected when the dialog opened
+        self.selected_records = self.xml_logic.get_selected_items()
+        self.thread = LoadDataThread(self.selected_records, self.parameters)
         self.thread.data_loaded.connect(self.on_data_loaded)
         self.thread.progress.connect(self.update_progress_bar)  # Connect the progress signal
         self.thread.start()
@@ -201,6 +207,10 @@ class MassEditDialog(QDialog):
         add_button.clicked.connect(lambda: self.onAddClicked(param, add_combo))
         add_layout.addWidget(add_button)
         add_layout.addWidget(add_combo)
+        standard_button = QPushButton("Standard", self)
+        standard_button.setToolTip(f"Reset {param} of the selected items to Config/types.xml")
+        standard_button.clicked.connect(lambda: self.loadStandardElements(param))
+        add_layout.addWidget(standard_button)
         layout.addLayout(add_layout)
         setattr(self, f"{param.lower()}_add_combo", add_combo)
 
@@ -219,7 +229,7 @@ class MassEditDialog(QDialog):
 
     def load_initial_elements(self, param, layout):
         selected_items = self.xml_logic.get_selected_items()
-        all_elements = [element.get('name') for item in selected_items for element in item.findall(param.lower())]
+        all_elements = [element for item in selected_items for element in getattr(item, param.lower())]
         common_elements = set(all_elements)
 
         for element in common_elements:
@@ -232,56 +242,65 @@ class MassEditDialog(QDialog):
         combo.setCurrentText(element_value)
         combo.currentTextChanged.connect(lambda value, p=param, el=element_layout: self.update_element_value(p, value, el))
         remove_button = QPushButton("Remove", self)
-        remove_button.clicked.connect(lambda: self.onRemoveClicked(param, element_value, element_layout))
+        element_layout.element_value = element_value  # what the selected items hold, follows the combo
+        remove_button.clicked.connect(lambda: self.onRemoveClicked(param, element_layout.element_value, element_layout))
         element_layout.addWidget(combo)
         element_layout.addWidget(remove_button)
         layout.addLayout(element_layout)
         return element_layout
 
     def update_element_value(self, param, value, layout):
+        old_value = layout.element_value
+        if value == old_value:
+            return
         selected_items = self.xml_logic.get_selected_items()
-        for item in selected_items:
-            elements = item.findall(param.lower())
-            for element in elements:
-                if element.get('name') == value:
-                    element.set('name', value)
-                    print(f"Updated {param} element to value '{value}' for item '{item.get('name')}'")
-                    self.xml_logic.viewer.update_item_in_list(item.get('name'))
+        replaced_count = 0
+        with self.xml_logic.batch():
+            for item in selected_items:
+                elements = getattr(item, param.lower())
+                if old_value not in elements:
+                    continue
+                if value in elements:  # already there, the old one just goes
+                    elements = tuple(element for element in elements if element != old_value)
+                else:
+                    elements = tuple(value if element == old_value else element for element in elements)
+                setattr(item, param.lower(), elements)
+                replaced_count += 1
+                self.xml_logic.mark_changed(item.name)
+        layout.element_value = value
+        print(f"Replaced {param} '{old_value}' with '{value}' in {replaced_count} items")  # Debug info
 
     def onAddClicked(self, param, combo):
         value = combo.currentText()
         selected_items = self.xml_logic.get_selected_items()
         content_layout = getattr(self, f"{param.lower()}_content_layout")
-        added_elements = set()
-
-        for item in selected_items:
-            existing_elements = item.findall(param.lower())
-            if not any(element.get('name') == value for element in existing_elements):
-                ET.SubElement(item, param.lower(), name=value)
-                added_elements.add(value)
-                print(f"Added {param} element with value '{value}' to item '{item.get('name')}'")
-                self.xml_logic.viewer.update_item_in_list(item.get('name'))
-            else:
-                print(f"{param} element with value '{value}' already exists for item '{item.get('name')}'")
-
-        if added_elements:
+        added_count = 0
+
+        with self.xml_logic.batch():
+            for item in selected_items:
+                existing_elements = getattr(item, param.lower())
+                if value not in existing_elements:
+                    setattr(item, param.lower(), existing_elements + (value,))
+                    added_count += 1
+                    self.xml_logic.mark_changed(item.name)
+        print(f"Added {param} '{value}' to {added_count} items")  # Debug info
+
+        if added_count:
             self.add_element_layout(param, content_layout, value)
-            self.force_refresh_active_item()  # Принудительно обновляем активный элемент
 
     def onRemoveClicked(self, param, value, layout):
         selected_items = self.xml_logic.get_selected_items()
-        for item in selected_items:
-            elements = item.findall(param.lower())
-            for element in elements:
-                if element.get('name') == value:
-                    item.remove(element)
-                    print(f"Removed {param} element with value '{value}' from item '{item.get('name')}'")
-                    self.xml_logic.viewer.update_item_in_list(item.get('name'))
+        with self.xml_logic.batch():
+            for item in selected_items:
+                elements = getattr(item, param.lower())
+                if value in elements:
+                    setattr(item, param.lower(), tuple(element for element in elements if element != value))
+                    self.xml_logic.mark_changed(item.name)
+        print(f"Removed {param} '{value}' from selected items")  # Debug info
         for i in reversed(range(layout.count())):
             widget = layout.itemAt(i).widget()
             if widget:
                 widget.deleteLater()
-        self.force_refresh_active_item()  # Принудительно обновляем активный элемент
 
     def update_slider_label(self, label, value, param):
         label.setText(f"{value}%")
@@ -290,7 +309,7 @@ class MassEditDialog(QDialog):
         self.apply_slider_value(param, value)  # Применяем значение сразу
 
     def update_avg_value_label(self, param, label, slider_value=100):
-        initial_values = self.initial_values.get(param, [])
+        initial_values = [value for value in self.initial_values.get(param, []) if is_count(value)]
         if initial_values:
             total_value = sum(initial_values)
             avg_value = total_value / len(initial_values)
@@ -317,17 +336,13 @@ class MassEditDialog(QDialog):
             self.loadStandardValues()
             return
 
-        for param in self.parameters:
-            if self.checkboxes[param].isChecked() and not self.input_fields[param].text():
-                for item in self.xml_logic.get_selected_items():
-                    element = item.find(param)
-                    if element is not None and element.text.isdigit():
-                        current_value = int(element.text)
-                        new_value = int(current_value * multiplier)
-                        element.text = str(new_value)
-                        print(f"Set {param} to {new_value} for item '{item.get('name')}' using multiplier {multiplier}")
-                        self.xml_logic.viewer.update_item_in_list(item.get('name'))
-                        self.force_refresh_active_item()  # Принудительно обновляем активный элемент
+        selected_items = self.xml_logic.get_selected_items()
+        with self.xml_logic.batch():
+            for param in self.parameters:
+                if self.checkboxes[param].isChecked() and not self.input_fields[param].text():
+                    for item in mass_engine.scale_column(selected_items, param, multiplier):
+                        self.xml_logic.mark_changed(item.name)
+                    print(f"Applied multiplier {multiplier} to {param} for {len(selected_items)} items")  # Debug info
 
     def onInputChanged(self, param):
         if self.input_fields[param].text():
@@ -335,72 +350,71 @@ class MassEditDialog(QDialog):
         self.checkboxes[param].setEnabled(not self.input_fields[param].text())
 
     def onOk(self):
+        if self.category_checkbox.isChecked():
+            self.apply_category(self.category_combo.currentText())
         self.accept()
 
+    def apply_category(self, category):
+        selected_items = self.xml_logic.get_selected_items()
+        with self.xml_logic.batch():
+            for item in selected_items:
+                if item.category != category:
+                    item.category = category
+                    self.xml_logic.mark_changed(item.name)
+        print(f"Set category to {category} for {len(selected_items)} items")  # Debug info
+
     def onCancel(self):
         self.reject()
 
     def apply_slider_value(self, param, slider_value):
-        selected_items = self.xml_logic.get_selected_items()
-        if len(self.initial_values[param]) != len(selected_items):
-            QMessageBox.critical(self, "Error", "The number of original values does not match the number of selected items.")
+        if param not in self.initial_values:
+            print(f"Initial values are still loading, {param} slider ignored")  # Debug info
             return
-        for index, item in enumerate(selected_items):
-            element = item.find(param)
-            if element is not None and element.text.isdigit():
-                try:
-                    original_value = self.initial_values[param][index]
-                    new_value = int(original_value * (slider_value / 100))
-                    element.text = str(new_value)
-                    print(f"Set {param} to {new_value} for item '{item.get('name')}' using slider value {slider_value}%")
-                    self.xml_logic.viewer.update_item_in_list(item.get('name'))
-                    self.force_refresh_active_item()  # Принудительно обновляем активный элемент
-                except IndexError as e:
-                    print(f"IndexError: {e}. Index: {index}, Param: {param}, Selected Items: {len(selected_items)}, Initial Values: {len(self.initial_values[param])}")
-                    QMessageBox.critical(self, "Error", f"IndexError: {e}. Check the console for more details.")
-                    return
+        with self.xml_logic.batch(self.merge_key('slider', param, self.selected_records)):
+            for item in mass_engine.scale_from_baseline(self.selected_records, param, self.initial_values[param], slider_value):
+                self.xml_logic.mark_changed(item.name)
+
+    def merge_key(self, action, param, records):
+        """Slider ticks and keystrokes on one field of the same selection make a single undo step."""
+        return (action, param, frozenset(map(id, records)))
 
     def apply_combo_values(self, param, selected_items):
         combo = getattr(self, f"{param}_add_combo")
         value = combo.currentText()
         if value:
-            for item in selected_items:
-                existing_elements = item.findall(param.lower())
-                if not any(element.get('name') == value for element in existing_elements):
-                    ET.SubElement(item, param.lower(), name=value)
-                    print(f"Added new {param} element with value '{value}' to item '{item.get('name')}'")
-                    self.xml_logic.viewer.update_item_in_list(item.get('name'))
-                    self.force_refresh_active_item()  # Принудительно обновляем активный элемент
+            with self.xml_logic.batch():
+                for item in selected_items:
+                    existing_elements = getattr(item, param.lower())
+                    if value not in existing_elements:
+                        setattr(item, param.lower(), existing_elements + (value,))
+                        self.xml_logic.mark_changed(item.name)
 
     def apply_input_value(self, param, value):
         selected_items = self.xml_logic.get_selected_items()
-        for item in selected_items:
-            element = item.find(param)
-            if element is not None:
-                element.text = value
-            else:
-                element = ET.SubElement(item, param)
-                element.text = value
-            print(f"Set {param} to {value} for item '{item.get('name')}'")
-            self.xml_logic.viewer.update_item_in_list(item.get('name'))
-            self.force_refresh_active_item()  # Принудительно обновляем активный элемент
+        new_value = parse_int(value)
+        with self.xml_logic.batch(self.merge_key('input', param, selected_items)):
+            for item in mass_engine.set_column(selected_items, param, new_value):
+                self.xml_logic.mark_changed(item.name)
+        print(f"Set {param} to {value} for {len(selected_items)} items")  # Debug info
 
     def loadStandardValues(self):
-        for param in self.parameters:
-            if self.checkboxes[param].isChecked():
-                selected_items = self.xml_logic.get_selected_items()
-                for item in selected_items:
-                    item_name = item.get('name')
-                    original_value = self.xml_logic.initial_values.get(item_name, {}).get(param, '')
-                    element = item.find(param)
-                    if element is not None:
-                        element.text = original_value
-                    else:
-                        element = ET.SubElement(item, param)
-                        element.text = original_value
-                    print(f"Restored {param} to {original_value} for item '{item.get('name')}'")
-                self.force_refresh_active_item()  # Принудительно обновляем активный элемент
-
-    def force_refresh_active_item(self):
-        self.parent.xml_logic.saveCurrentItemDetails()
-        self.parent.force_update_active_item()
+        selected_items = self.xml_logic.get_selected_items()
+        fields = [param for param in self.parameters if self.checkboxes[param].isChecked()]
+        if self.category_checkbox.isChecked():
+            fields.append('category')
+        changed = self.xml_logic.reset_to_standard(selected_items, fields)
+        print(f"Restored {', '.join(fields)} for {len(changed)} of {len(selected_items)} items")  # Debug info
+
+    def loadStandardElements(self, param):
+        selected_items = self.xml_logic.get_selected_items()
+        changed = self.xml_logic.reset_to_standard(selected_items, [param.lower()])
+        print(f"Restored {param} for {len(changed)} of {len(selected_items)} items")  # Debug info
+        # Show the restored elements instead of the old ones
+        content_layout = getattr(self, f"{param.lower()}_content_layout")
+        while content_layout.count():
+            element_layout = content_layout.takeAt(0).layout()
+            for i in reversed(range(element_layout.count())):
+                widget = element_layout.itemAt(i).widget()
+                if widget:
+                    widget.deleteLater()
+        self.load_initial_elements(param, content_layout)
@@ -0,0 +1,103 @@
+# Column-wise numeric operations for the mass edit: each function treats one field of
+# the selected records as a column, writes the results back and returns the changed records.
+from type_record import is_count
+
+# NumPy is optional and only imported for columns long enough to gain from it
+NUMPY_MIN_ROWS = 256
+np = None
+
+
+def _numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            np = False
+        else:
+            np = numpy
+    return np
+
+
+def _scale(values, factor):
+    if len(values) >= NUMPY_MIN_ROWS and _numpy():
+        # float64 multiply then truncate towards zero, same as int(value * factor)
+        return (np.array(values, dtype=np.float64) * factor).astype(np.int64).tolist()
+    return [int(value * factor) for value in values]
+
+
+def _write(records, rows, field, new_values):
+    changed = []
+    for row, new_value in zip(rows, new_values):
+        record = records[row]
+        if getattr(record, field) != new_value:
+            setattr(record, field, new_value)
+            changed.append(record)
+    return changed
+
+
+def scale_column(records, field, factor):
+    """Multiply `field` by `factor` for every record that has a count there (x10, /2, ...)."""
+    rows = [row for row, record in enumerate(records) if is_count(getattr(record, field))]
+    values = [getattr(records[row], field) for row in rows]
+    return _write(records, rows, field, _scale(values, factor))
+
+
+def scale_from_baseline(records, field, baseline, percent):
+    """Set `field` to percent% of `baseline`, a list aligned with `records` (slider)."""
+    factor = percent / 100
+    rows = [row for row, record in enumerate(records)
+            if is_count(getattr(record, field)) and is_count(baseline[row])]
+    values = [baseline[row] for row in rows]
+    return _write(records, rows, field, _scale(values, factor))
+
+
+def set_column(records, field, value):
+    """Set `field` to the same value on every record (value inputs, CLI "=N")."""
+    rows = range(len(records))
+    return _write(records, rows, field, [value] * len(records))
+
+
+def reset_to_baseline(records, field, baseline):
+    """Copy `field` from `baseline`, a dict of name -> value ("Standard")."""
+    rows = [row for row, record in enumerate(records) if record.name in baseline]
+    values = [baseline[records[row].name] for row in rows]
+    return _write(records, rows, field, values)
+
+
+def round_column(records, field, step):
+    """Round `field` to the nearest multiple of `step` where it holds a count (rules)."""
+    rows = [row for row, record in enumerate(records) if is_count(getattr(record, field))]
+    values = [(getattr(records[row], field) + step // 2) // step * step for row in rows]
+    return _write(records, rows, field, values)
+
+
+def clamp_column(records, field, low=None, high=None):
+    """Keep `field` within low..high (None for an open end) where it holds a count (rules)."""
+    rows = [row for row, record in enumerate(records) if is_count(getattr(record, field))]
+    values = [getattr(records[row], field) for row in rows]
+    if low is not None:
+        values = [max(value, low) for value in values]
+    if high is not None:
+        values = [min(value, high) for value in values]
+    return _write(records, rows, field, values)
+
+
+def parse_operation(spec):
+    """'x2', '*2', '/2', '150%' -> ('scale', factor); '=3600', '3600' or 3600 -> ('set', 3600);
+    'standard' -> ('standard', None), the value from Config/types.xml. ValueError otherwise."""
+    if isinstance(spec, int) and not isinstance(spec, bool):
+        return 'set', spec
+    text = str(spec).strip()
+    if text.lower() == 'standard':
+        return 'standard', None
+    try:
+        if text[:1] in ('x', 'X', '*'):
+            return 'scale', float(text[1:])
+        if text[:1] == '/':
+            return 'scale', 1 / float(text[1:])
+        if text.endswith('%'):
+            return 'scale', float(text[:-1]) / 100
+        return 'set', int(text[1:] if text.startswith('=') else text)
+    except (ValueError, ZeroDivisionError):
+        raise ValueError(f"invalid operation '{spec}' (use x2, /2, 150%, =N or standard)") from None
@@ -0,0 +1,111 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from source_document import SourceDocument, scan_type_spans
+from type_record import TypeRecord, records_from_bytes
+
+# A <types> root, tells a broken types file from other files named .xml
+TYPES_ROOT = re.compile(rb'<types[\s/>]')
+
+
+def read_types_file(path):
+    """Parse one types file: (path, root tag, root attributes, records, SourceDocument or None)."""
+    with open(path, 'rb') as f:
+        return _parse_records(path, f.read())
+
+
+def _parse_records(path, data):
+    root_tag, root_attrib, records = records_from_bytes(data)
+    return path, root_tag, root_attrib, records, SourceDocument.from_bytes(data, records)
+
+
+def parse_types_file(path):
+    """Worker side of load_types_files: everything CPU-bound (XML parse, span scan)
+    for one file, returned as plain tuples so the batch pickles small and fast."""
+    with open(path, 'rb') as f:
+        return _parse_rows(path, f.read())
+
+
+def _parse_rows(path, data):
+    root_tag, root_attrib, records = records_from_bytes(data)
+    rows = [record.to_row() for record in records]
+    return path, root_tag, root_attrib, rows, data, scan_type_spans(data)
+
+
+def read_folder_file(path, parse=_parse_rows):
+    """parse(path, data) for a file found in a folder, or (path, None, reason) if it
+    cannot be read, or is not XML and has no <types> root. A broken types file still fails."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return path, None, str(e)
+    try:
+        return parse(path, data)
+    except ET.ParseError as e:
+        if TYPES_ROOT.search(data):
+            raise
+        return path, None, str(e)
+
+
+def _build(batch):
+    path, root_tag, root_attrib, rows, data, scan = batch
+    records = [TypeRecord.from_row(row) for row in rows]
+    return path, root_tag, root_attrib, records, SourceDocument.from_scan(data, records, scan)
+
+
+def load_types_files(paths, max_workers=None, progress=None, skipped=None):
+    """read_types_file() for every path, parsed in a process pool; results keep the order of paths.
+
+    progress(percent) is called as files finish. A single file is parsed in this
+    process, since starting workers would cost more than it saves. With a
+    skipped list (folder mode), files read_folder_file() can't read are left out
+    and (path, reason) is appended to it instead of failing the load.
+    """
+    paths = list(paths)
+    workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        results = []
+        for done, path in enumerate(paths, 1):
+            if skipped is None:
+                results.append(read_types_file(path))
+            else:
+                result = read_folder_file(path, _parse_records)
+                if result[1] is None:
+                    skipped.append((path, result[2]))
+                else:
+                    results.append(result)
+            if progress is not None:
+                progress(done * 100 // len(paths))
+        return results
+
+    batches = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if skipped is None:
+            futures = {pool.submit(parse_types_file, path): path for path in paths}
+        else:
+            futures = {pool.submit(read_folder_file, path): path for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                batch = future.result()
+            except Exception as e:
+                raise ValueError(f"{futures[future]}: {e}") from e
+            batches[batch[0]] = batch
+            if progress is not None:
+                progress(done * 100 // len(paths))
+    if skipped is not None:
+        skipped.extend((path, batches[path][2]) for path in paths if batches[path][1] is None)
+    return [_build(batches[path]) for path in paths if batches[path][1] is not None]
+
+
+def types_files_in_folder(folder):
+    """Every .xml file below folder, sorted by path; load_folder keeps those with a <types> root."""
+    paths = []
+    for directory, subdirectories, files in os.walk(folder):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith('.xml'):
+                paths.append(os.path.join(directory, name))
+    return paths
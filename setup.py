@@ -3,7 +3,8 @@ from cx_Freeze import setup, Executable
 
 # Укажите файлы и папки, которые необходимо включить в сборку
 include_files = [
-    ("icons", "icons")  # Копировать папку resources
+    ("icons", "icons"),  # Копировать папку resources
+    ("Config", "Config"),  # Config/types.xml, the values of the Standard button
 ]
 
 setup(
@@ -0,0 +1,167 @@
+import xml.parsers.expat
+
+from xml_writer import INDENT, format_record
+
+
+def scan_type_spans(data):
+    """Byte ranges of the <type> children of the root, in document order.
+
+    Returns (list of (name, start, end), offset of the root's closing tag, encoding).
+    """
+    parser = xml.parsers.expat.ParserCreate()
+    spans = []
+    state = {'depth': 0, 'open': None, 'closing': None, 'close_offset': None, 'encoding': 'utf-8'}
+
+    def close_pending():
+        # The first event after </type> (or <type/>) starts where the element ended
+        if state['closing'] is not None:
+            name, start = state['closing']
+            spans.append((name, start, parser.CurrentByteIndex))
+            state['closing'] = None
+
+    def on_xml_decl(version, encoding, standalone):
+        if encoding:
+            state['encoding'] = encoding
+
+    def on_start(tag, attrib):
+        close_pending()
+        if state['depth'] == 1 and tag == 'type':
+            state['open'] = (attrib.get('name'), parser.CurrentByteIndex)
+        state['depth'] += 1
+
+    def on_end(tag):
+        close_pending()
+        state['depth'] -= 1
+        if state['depth'] == 1 and tag == 'type':
+            state['closing'] = state['open']
+        elif state['depth'] == 0:
+            state['close_offset'] = parser.CurrentByteIndex
+
+    def on_other(*args):
+        close_pending()
+
+    parser.XmlDeclHandler = on_xml_decl
+    parser.StartElementHandler = on_start
+    parser.EndElementHandler = on_end
+    parser.CharacterDataHandler = on_other
+    parser.CommentHandler = on_other
+    parser.ProcessingInstructionHandler = on_other
+    parser.Parse(data, True)
+    return spans, state['close_offset'], state['encoding']
+
+
+class SourceDocument:
+    """The bytes a types file was loaded from, and where each record's <type> sits in them.
+
+    render() rewrites only the blocks of dirty records, drops blocks of removed
+    records and appends new records before the closing root tag. Everything
+    else is copied byte for byte.
+    """
+
+    def __init__(self, data, spans, close_offset, encoding='utf-8'):
+        self.data = data
+        self.spans = spans
+        self.close_offset = close_offset
+        self.encoding = encoding
+        self.newline = '\r\n' if b'\r\n' in data[:4096] else '\n'
+        self.indent = self._detect_indent()
+
+    @classmethod
+    def from_bytes(cls, data, records):
+        """Link records (as parsed from data, in document order) to their byte ranges.
+
+        Returns None when the two do not line up; callers then fall back to a full write.
+        """
+        return cls.from_scan(data, records, scan_type_spans(data))
+
+    @classmethod
+    def from_scan(cls, data, records, scan):
+        """Same as from_bytes, with the scan_type_spans(data) result computed elsewhere."""
+        spans, close_offset, encoding = scan
+        if close_offset is None or len(spans) != len(records):
+            return None
+        linked = {}
+        for record, (name, start, end) in zip(records, spans):
+            if record.name != name:
+                return None
+            linked[record] = (start, end)
+        return cls(data, linked, close_offset, encoding)
+
+    def _detect_indent(self):
+        """Indentation of the first <type> line (e.g. 4 spaces or a tab in hand-made mod files)."""
+        if not self.spans:
+            return INDENT
+        start = min(start for start, end in self.spans.values())
+        line_start = self.data.rfind(b'\n', 0, start) + 1
+        indent = self.data[line_start:start]
+        if not indent or indent.strip(b' \t'):
+            return INDENT
+        return indent.decode('ascii')
+
+    def _block(self, record):
+        text = format_record(record, indent=self.indent).lstrip(' \t')
+        if self.newline != '\n':
+            text = text.replace('\n', self.newline)
+        return text.encode(self.encoding, 'xmlcharrefreplace')
+
+    def _line_bounds(self, start, end):
+        """Widen a removed block to its whole line(s) when it sits on lines of its own."""
+        line_start = start
+        while line_start > 0 and self.data[line_start - 1:line_start] in (b' ', b'\t'):
+            line_start -= 1
+        if line_start > 0 and self.data[line_start - 1:line_start] != b'\n':
+            return start, end
+        if self.data[end:end + 2] == b'\r\n':
+            return line_start, end + 2
+        if self.data[end:end + 1] == b'\n':
+            return line_start, end + 1
+        return start, end
+
+    def render(self, records, dirty):
+        """Return (new bytes, new spans, new close offset) for the current records."""
+        live = set(records)
+        parts = []
+        spans = {}
+        size = 0
+        position = 0
+        for record, (start, end) in sorted(self.spans.items(), key=lambda item: item[1][0]):
+            if record not in live:
+                cut_start, cut_end = self._line_bounds(start, end)
+                parts.append(self.data[position:cut_start])
+                size += cut_start - position
+                position = cut_end
+                continue
+            gap = self.data[position:start]
+            block = self._block(record) if record in dirty else self.data[start:end]
+            parts.append(gap)
+            parts.append(block)
+            spans[record] = (size + len(gap), size + len(gap) + len(block))
+            size += len(gap) + len(block)
+            position = end
+        gap = self.data[position:self.close_offset]
+        parts.append(gap)
+        size += len(gap)
+
+        # Records that were not in the source go on their own lines before the closing tag
+        newline = self.newline.encode(self.encoding)
+        indent = self.indent.encode(self.encoding)
+        at_line_start = b''.join(parts[-3:]).rstrip(b' \t').endswith(b'\n')
+        for record in records:
+            if record in self.spans:
+                continue
+            if not at_line_start:
+                parts.append(newline)
+                size += len(newline)
+                at_line_start = True
+            block = self._block(record)
+            parts.extend((indent, block, newline))
+            spans[record] = (size + len(indent), size + len(indent) + len(block))
+            size += len(indent) + len(block) + len(newline)
+        parts.append(self.data[self.close_offset:])
+        return b''.join(parts), spans, size
+
+    def commit(self, data, spans, close_offset):
+        """Adopt the result of render() once it has been written."""
+        self.data = data
+        self.spans = spans
+        self.close_offset = close_offset
@@ -0,0 +1,46 @@
+"""The journal writer stopping on a disk error."""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edit_journal import EditJournal
+from types_store import TypesStore
+
+CONFIG_TYPES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Config', 'types.xml')
+
+
+class EditJournalErrorTest(unittest.TestCase):
+
+    def unwritable_journal(self):
+        folder = tempfile.mkdtemp()
+        os.rmdir(folder)  # the journal can't be created in a folder that is gone
+        journal = EditJournal(os.path.join(folder, 'types.xml.journal'), ())
+        journal._thread.join()
+        return journal
+
+    def test_append_after_error_is_dropped(self):
+        journal = self.unwritable_journal()
+        self.assertIsInstance(journal.error, OSError)
+        journal.append([('remove', 'AKM')])
+        journal.truncate(())
+        self.assertTrue(journal._queue.empty())
+        journal.close()
+
+    def test_store_reports_error_once(self):
+        store = TypesStore()
+        store.load(CONFIG_TYPES)
+        errors = []
+        store.journal_failed = errors.append
+        store.journal = self.unwritable_journal()
+        for name in list(store.records)[:3]:
+            store.records[name].nominal = 1
+            store.mark_changed(name)
+        self.assertEqual(len(errors), 1)
+        self.assertIsNone(store.journal)
+
+
+if __name__ == '__main__':
+    unittest.main()
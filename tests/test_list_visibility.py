@@ -0,0 +1,78 @@
+"""Types added or removed by a batch show up in, or leave, the filtered list."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+
+from type_diff import records_by_name
+from type_record import TypeRecord, load_records
+from ui import XMLViewer
+
+CONFIG_TYPES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Config', 'types.xml')
+
+app = QApplication.instance() or QApplication([])
+
+
+class ListVisibilityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.folder, 'types.xml')
+        shutil.copy(CONFIG_TYPES, self.file_name)
+        self.viewer = XMLViewer()
+        self.viewer.ask_recover_journal = lambda count: True
+        self.xml_logic = self.viewer.xml_logic
+        self.xml_logic.loadXML(self.file_name)
+
+    def tearDown(self):
+        self.xml_logic.close_journal()
+        self.viewer.deleteLater()
+        shutil.rmtree(self.folder)
+
+    def visible(self, name):
+        return name in self.viewer.proxy_model.visible_names()
+
+    def category_count(self, category):
+        return self.viewer.category_checkboxes[category].text()
+
+    def test_merge_shows_added_type(self):
+        base = records_by_name(load_records(self.file_name)[2])
+        weapons = sum(record.category == 'weapons' for record in base.values())
+        theirs = list(base.values()) + [TypeRecord('NewGun', nominal=5, category='weapons')]
+        self.xml_logic.merge_update(base, theirs)
+        self.assertTrue(self.visible('NewGun'))
+        self.assertEqual(self.category_count('weapons'), f"weapons ({weapons + 1})")
+
+    def test_merge_hides_removed_type(self):
+        base = records_by_name(load_records(self.file_name)[2])
+        gone = next(name for name, record in base.items() if record.category == 'weapons')
+        weapons = sum(record.category == 'weapons' for record in base.values())
+        self.xml_logic.merge_update(base, [record for name, record in base.items() if name != gone])
+        self.assertNotIn(gone, self.xml_logic.records)
+        self.assertFalse(self.visible(gone))
+        self.assertEqual(self.category_count('weapons'), f"weapons ({weapons - 1})")
+
+    def test_recovered_types_are_filtered(self):
+        gone = next(name for name, record in self.xml_logic.records.items() if record.category == 'weapons')
+        self.xml_logic.add_item(TypeRecord('NewGun', nominal=5, category='weapons'))
+        self.xml_logic.remove_item(gone)
+        # Closed with unsaved edits, as after a crash: the journal stays for the next session
+        self.xml_logic.close_journal()
+        self.viewer.deleteLater()
+        self.viewer = XMLViewer()
+        self.viewer.ask_recover_journal = lambda count: True
+        self.xml_logic = self.viewer.xml_logic
+        self.xml_logic.loadXML(self.file_name)
+        self.assertIn('NewGun', self.xml_logic.records)
+        self.assertTrue(self.visible('NewGun'))
+        self.assertFalse(self.visible(gone))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# Structural diff of types by name: added and removed types, changed numbers,
+# flags and category, and usage/value/tag compared as sets.
+from type_record import NUMERIC_FIELDS, FLAG_NAMES, LIST_FIELDS
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+
+class TypeDiff:
+    """One differing type. `changes` holds (field, old, new) for changed types;
+    for usage/value/tag old and new are the names removed and added."""
+
+    __slots__ = ('kind', 'name', 'changes')
+
+    def __init__(self, kind, name, changes=()):
+        self.kind = kind
+        self.name = name
+        self.changes = changes
+
+    def __str__(self):
+        if self.kind == ADDED:
+            return f"+ {self.name}"
+        if self.kind == REMOVED:
+            return f"- {self.name}"
+        return f"~ {self.name}: " + ", ".join(format_change(*change) for change in self.changes)
+
+
+def _text(value):
+    return 'none' if value is None else str(value)
+
+
+def format_change(field, old, new):
+    if field in LIST_FIELDS:
+        return f"{field} " + " ".join([f"-{name}" for name in old] + [f"+{name}" for name in new])
+    return f"{field} {_text(old)} -> {_text(new)}"
+
+
+def field_changes(old, new):
+    """(field, old, new) for every field that differs between two records of the same type."""
+    changes = []
+    for field in NUMERIC_FIELDS + ('category',):
+        old_value, new_value = getattr(old, field), getattr(new, field)
+        if old_value != new_value:
+            changes.append((field, old_value, new_value))
+    if old.flags != new.flags:
+        old_mask, new_mask = old.flags or 0, new.flags or 0
+        if old_mask == new_mask:
+            changes.append(('flags', old.flags, new.flags))  # <flags> added or dropped, all zero
+        for bit, flag in enumerate(FLAG_NAMES):
+            old_bit, new_bit = old_mask >> bit & 1, new_mask >> bit & 1
+            if old_bit != new_bit:
+                changes.append((flag, old_bit, new_bit))
+    for field in LIST_FIELDS:
+        old_names, new_names = getattr(old, field), getattr(new, field)
+        if old_names != new_names:
+            removed = tuple(name for name in old_names if name not in new_names)
+            added = tuple(name for name in new_names if name not in old_names)
+            if removed or added:  # only the order moved otherwise
+                changes.append((field, removed, added))
+    return changes
+
+
+def diff_types(base, records):
+    """Yield a TypeDiff for every type of `records` that is new or differs from
+    `base` (name -> TypeRecord), then one for every base type `records` lacks.
+
+    `records` is only iterated once, so it can be a stream (iter_records) and
+    the diffs can be consumed while they are produced. One dict lookup per
+    type: linear in the size of both sides. Like the editor, only the first
+    entry of a duplicated name counts.
+    """
+    seen = set()
+    for record in records:
+        name = record.name
+        if name in seen:
+            continue
+        seen.add(name)
+        old = base.get(name)
+        if old is None:
+            yield TypeDiff(ADDED, name)
+            continue
+        changes = field_changes(old, record)
+        if changes:
+            yield TypeDiff(CHANGED, name, changes)
+    for name in base:
+        if name not in seen:
+            yield TypeDiff(REMOVED, name)
+
+
+def records_by_name(records):
+    """name -> first record of that name, the base side of diff_types()."""
+    base = {}
+    for record in records:
+        base.setdefault(record.name, record)
+    return base
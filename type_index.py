@@ -0,0 +1,279 @@
+from bisect import bisect_left, bisect_right, insort
+
+from type_record import FLAG_NAMES
+
+FACETS = ('category', 'usage', 'value', 'tag', 'flags')
+RANGE_FIELDS = ('nominal', 'min', 'lifetime', 'restock')
+# Search text shorter than this is matched as a prefix, longer as a substring
+TRIGRAM = 3
+
+
+def facet_keys(record):
+    """The (deduplicated) keys a record is filed under, per facet. Flags use the flag names that are set."""
+    return {
+        'category': () if record.category is None else (record.category,),
+        'usage': tuple(dict.fromkeys(record.usage)),
+        'value': tuple(dict.fromkeys(record.value)),
+        'tag': tuple(dict.fromkeys(record.tag)),
+        'flags': tuple(flag for flag in FLAG_NAMES if record.get_flag(flag)),
+    }
+
+
+def range_keys(record):
+    """Integer values of the range-indexed fields; None where a field is missing or not a number."""
+    keys = {}
+    for field in RANGE_FIELDS:
+        value = getattr(record, field)
+        keys[field] = value if type(value) is int else None
+    return keys
+
+
+def trigrams(text):
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+class TypeIndex:
+    """Inverted indexes over the loaded records: facet -> key -> set of records,
+    plus a sorted (value, serial) list per numeric field for range queries and
+    a lowercase name index (sorted list for prefixes, trigrams for substrings).
+
+    Records are tracked by identity. The keys a record was last filed under
+    are remembered, so update() compares facet keys, numbers and the name
+    separately and moves only the entries that differ; a numeric edit never
+    touches the name or trigram entries. Counts for the filter panel are the
+    sizes of the posting sets.
+    """
+
+    def __init__(self):
+        self.postings = {facet: {} for facet in FACETS}
+        self._keys = {}
+        # Serial numbers make the sorted entries unique and let bisect find one record exactly
+        self._serials = {}
+        self._by_serial = {}
+        self._next_serial = 0
+        self._sorted = {field: [] for field in RANGE_FIELDS}
+        # Loading appends unsorted and sorts once on first use instead of insort per record
+        self._unsorted = set()
+        self._names = []
+        self._trigrams = {}
+
+    def clear(self):
+        for postings in self.postings.values():
+            postings.clear()
+        for entries in self._sorted.values():
+            entries.clear()
+        self._keys.clear()
+        self._serials.clear()
+        self._by_serial.clear()
+        self._unsorted.clear()
+        self._names.clear()
+        self._trigrams.clear()
+
+    def add(self, record):
+        self._add(record, bulk=False)
+
+    def add_many(self, records):
+        """Index a batch (e.g. a loaded chunk); the sorted lists are sorted once on next use."""
+        for record in records:
+            self._add(record, bulk=True)
+
+    def _add(self, record, bulk):
+        keys = facet_keys(record)
+        ranges = range_keys(record)
+        name = record.name.lower()
+        self._keys[record] = (keys, ranges, name)
+        for facet, values in keys.items():
+            for value in values:
+                self._file(facet, value, record)
+
+        serial = self._serials.get(record)
+        if serial is None:
+            serial = self._next_serial
+            self._next_serial += 1
+            self._serials[record] = serial
+            self._by_serial[serial] = record
+        for field, value in ranges.items():
+            if value is not None:
+                self._insert(field, (value, serial), bulk)
+        self._insert('name', (name, serial), bulk)
+        for trigram in trigrams(name):
+            self._trigrams.setdefault(trigram, set()).add(record)
+
+    def remove(self, record):
+        entry = self._keys.pop(record, None)
+        if entry is None:
+            return
+        keys, ranges, name = entry
+        for facet, values in keys.items():
+            for value in values:
+                self._unfile(facet, value, record)
+
+        serial = self._serials.pop(record)
+        del self._by_serial[serial]
+        for field, value in ranges.items():
+            if value is not None:
+                self._discard(field, (value, serial))
+        self._discard('name', (name, serial))
+        for trigram in trigrams(name):
+            self._untrigram(trigram, record)
+
+    def update(self, record):
+        """Re-index one record after an edit or rename, moving only the entries whose
+        key changed. Returns the set of what changed: facet names, range fields and 'name'."""
+        entry = self._keys.get(record)
+        if entry is None:
+            self.add(record)
+            return set(FACETS + RANGE_FIELDS + ('name',))
+        old_keys, old_ranges, old_name = entry
+        keys = facet_keys(record)
+        ranges = range_keys(record)
+        name = record.name.lower()
+        changed = set()
+        for facet in FACETS:
+            old_values, values = old_keys[facet], keys[facet]
+            if old_values != values:
+                changed.add(facet)
+                for value in set(old_values) - set(values):
+                    self._unfile(facet, value, record)
+                for value in set(values) - set(old_values):
+                    self._file(facet, value, record)
+        serial = self._serials[record]
+        for field in RANGE_FIELDS:
+            old_value, value = old_ranges[field], ranges[field]
+            if old_value != value:
+                changed.add(field)
+                if old_value is not None:
+                    self._discard(field, (old_value, serial))
+                if value is not None:
+                    self._insert(field, (value, serial))
+        if name != old_name:
+            changed.add('name')
+            self._discard('name', (old_name, serial))
+            self._insert('name', (name, serial))
+            old_trigrams, new_trigrams = trigrams(old_name), trigrams(name)
+            for trigram in old_trigrams - new_trigrams:
+                self._untrigram(trigram, record)
+            for trigram in new_trigrams - old_trigrams:
+                self._trigrams.setdefault(trigram, set()).add(record)
+        if changed:
+            self._keys[record] = (keys, ranges, name)
+        return changed
+
+    def _file(self, facet, value, record):
+        self.postings[facet].setdefault(value, set()).add(record)
+
+    def _unfile(self, facet, value, record):
+        postings = self.postings[facet]
+        members = postings.get(value)
+        if members is not None:
+            members.discard(record)
+            if not members:
+                del postings[value]
+
+    def _untrigram(self, trigram, record):
+        members = self._trigrams.get(trigram)
+        if members is not None:
+            members.discard(record)
+            if not members:
+                del self._trigrams[trigram]
+
+    def _insert(self, field, entry, bulk=False):
+        entries = self._names if field == 'name' else self._sorted[field]
+        if bulk or field in self._unsorted:
+            entries.append(entry)
+            self._unsorted.add(field)
+        else:
+            insort(entries, entry)
+
+    def _discard(self, field, entry):
+        entries = self._sorted_entries(field)
+        position = bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+
+    def _sorted_entries(self, field):
+        entries = self._names if field == 'name' else self._sorted[field]
+        if field in self._unsorted:
+            entries.sort()
+            self._unsorted.discard(field)
+        return entries
+
+    def range_query(self, field, low=None, high=None):
+        """Records whose `field` lies in [low, high]; either bound may be None."""
+        entries = self._sorted_entries(field)
+        start = 0 if low is None else bisect_left(entries, (low, -1))
+        end = len(entries) if high is None else bisect_right(entries, (high, self._next_serial))
+        by_serial = self._by_serial
+        return {by_serial[serial] for value, serial in entries[start:end]}
+
+    def prefix_query(self, prefix):
+        """Records whose lowercase name starts with prefix."""
+        prefix = prefix.lower()
+        names = self._sorted_entries('name')
+        start = bisect_left(names, (prefix, -1))
+        by_serial = self._by_serial
+        result = set()
+        for name, serial in names[start:]:
+            if not name.startswith(prefix):
+                break
+            result.add(by_serial[serial])
+        return result
+
+    def search(self, text):
+        """Records whose name contains text (case-insensitive).
+
+        One or two characters would match nearly everything as a substring,
+        so short text is matched as a name prefix instead.
+        """
+        text = text.lower()
+        if len(text) < TRIGRAM:
+            return self.prefix_query(text)
+        candidates = [self._trigrams.get(trigram, set()) for trigram in trigrams(text)]
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for members in candidates[1:]:
+            if not result:
+                break
+            result &= members
+        # Trigrams can match out of order ("abcxbcd" has every trigram of "abcd"), so check
+        return {record for record in result if text in self._keys[record][2]}
+
+    def count(self, facet, key):
+        return len(self.postings[facet].get(key, ()))
+
+    def query(self, filters, ranges=None, text=None):
+        """Records matching filters, a dict of facet -> selected keys, ranges,
+        a dict of numeric field -> (low, high), and the search text.
+
+        Keys of one facet are OR-ed, facets, ranges and text are AND-ed. Facets
+        with no keys, ranges with both bounds None and empty text do not
+        filter; if nothing filters at all, None is returned.
+        """
+        matches = []
+        if text:
+            matches.append(self.search(text))
+        for field, (low, high) in (ranges or {}).items():
+            if low is not None or high is not None:
+                matches.append(self.range_query(field, low, high))
+        for facet, keys in filters.items():
+            keys = list(keys)
+            if not keys:
+                continue
+            postings = self.postings[facet]
+            if len(keys) == 1:
+                matches.append(postings.get(keys[0], set()))
+            else:
+                matches.append(set().union(*(postings.get(key, ()) for key in keys)))
+        if not matches:
+            return None
+        # Intersect smallest first so every step is bounded by the current result
+        matches.sort(key=len)
+        result = set(matches[0])
+        for members in matches[1:]:
+            if not result:
+                break
+            result &= members
+        return result
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,121 @@
+# Three-way merge of types by name: re-applies our edits (ours) to a new vanilla
+# file (theirs), using the vanilla file they were made against (base).
+from type_diff import field_changes
+from type_record import NUMERIC_FIELDS, LIST_FIELDS
+
+OURS = 'ours'
+THEIRS = 'theirs'
+
+SCALAR_FIELDS = NUMERIC_FIELDS + ('category',)
+
+
+class MergeConflict:
+    """A field both sides changed differently, or field 'type' for a type one side
+    removed and the other changed. `kept` is the side whose value was used."""
+
+    __slots__ = ('name', 'field', 'base', 'ours', 'theirs', 'kept')
+
+    def __init__(self, name, field, base, ours, theirs, kept):
+        self.name = name
+        self.field = field
+        self.base = base
+        self.ours = ours
+        self.theirs = theirs
+        self.kept = kept
+
+    def __str__(self):
+        return (f"{self.name}: {self.field} base {self.base}, ours {self.ours}, "
+                f"theirs {self.theirs} -> kept {self.kept}")
+
+
+def _merge_value(base, ours, theirs):
+    """(value, conflict) for one scalar: the side that changed wins."""
+    if ours == theirs or theirs == base:
+        return ours, False
+    if ours == base:
+        return theirs, False
+    return ours, True
+
+
+def _merge_flags(base, ours, theirs):
+    if base is None or ours is None or theirs is None:
+        return _merge_value(base, ours, theirs)
+    # Bits we changed keep our value, every other bit follows the update
+    ours_changed = ours ^ base
+    return (ours & ours_changed) | (theirs & ~ours_changed), False
+
+
+def _merge_names(base, ours, theirs):
+    """usage/value/tag as sets: a name one side removed is gone, a name one side added is in."""
+    base_set, ours_set, theirs_set = set(base), set(ours), set(theirs)
+    removed = (base_set - ours_set) | (base_set - theirs_set)
+    merged = [name for name in ours if name not in removed]
+    merged.extend(name for name in theirs if name not in ours_set and name not in base_set)
+    return tuple(merged)
+
+
+def merge_record(base, ours, theirs, prefer=OURS):
+    """Merged copy of one type present on both sides and (field, base, ours, theirs)
+    for its conflicts. base is None for a type both sides added."""
+    merged = ours.copy()
+    conflicts = []
+    for field in SCALAR_FIELDS + ('flags',):
+        old = getattr(base, field) if base is not None else None
+        mine, new = getattr(ours, field), getattr(theirs, field)
+        merge = _merge_flags if field == 'flags' else _merge_value
+        value, conflict = merge(old, mine, new)
+        if conflict:
+            conflicts.append((field, old, mine, new))
+            if prefer == THEIRS:
+                value = new
+        setattr(merged, field, value)
+    for field in LIST_FIELDS:
+        old = getattr(base, field) if base is not None else ()
+        setattr(merged, field, _merge_names(old, getattr(ours, field), getattr(theirs, field)))
+    # Unknown children (extra) are not merged, ours are kept
+    return merged, conflicts
+
+
+def merge_types(base, theirs, ours, prefer=OURS):
+    """Merge our edited types into an update of the vanilla types.
+
+    base and ours map name -> TypeRecord (old vanilla, our file); theirs is the
+    new vanilla, iterated once, so it can be streamed with iter_records. Every
+    name is looked up once per side, linear in the total number of types.
+    Returns (merged records, conflicts): the update's order first, then the
+    types only we have. Conflicts are resolved for `prefer` and reported.
+    """
+    merged = []
+    conflicts = []
+    seen = set()
+    for record in theirs:
+        name = record.name
+        if name in seen:
+            continue
+        seen.add(name)
+        old = base.get(name)
+        mine = ours.get(name)
+        if mine is None:
+            if old is None:
+                merged.append(record)  # new in the update
+            elif field_changes(old, record):
+                # We removed a type the update changed
+                conflicts.append(MergeConflict(name, 'type', 'present', 'removed', 'changed', prefer))
+                if prefer == THEIRS:
+                    merged.append(record)
+            continue
+        record, record_conflicts = merge_record(old, mine, record, prefer)
+        conflicts.extend(MergeConflict(name, *conflict, prefer) for conflict in record_conflicts)
+        merged.append(record)
+    for name, mine in ours.items():
+        if name in seen:
+            continue
+        old = base.get(name)
+        if old is None:
+            merged.append(mine)  # our own type
+        elif field_changes(old, mine):
+            # The update removed a type we changed
+            conflicts.append(MergeConflict(name, 'type', 'present', 'changed', 'removed', prefer))
+            if prefer == OURS:
+                merged.append(mine)
+    return merged, conflicts
@@ -0,0 +1,155 @@
+import xml.etree.ElementTree as ET
+
+NUMERIC_FIELDS = ('nominal', 'lifetime', 'restock', 'min', 'quantmin', 'quantmax', 'cost')
+FLAG_NAMES = ('count_in_cargo', 'count_in_hoarder', 'count_in_map', 'count_in_player', 'crafted', 'deloot')
+# Same order as vanilla types.xml, also used when writing records back
+LIST_FIELDS = ('tag', 'usage', 'value')
+
+
+def parse_int(text):
+    """Parse element text once at load. Non-integer text is kept as a string."""
+    if text is None:
+        return ''
+    try:
+        return int(text)
+    except ValueError:
+        return text.strip()
+
+
+def is_count(value):
+    """True for values the mass edit may scale (what str.isdigit() accepted before)."""
+    return type(value) is int and value >= 0
+
+
+class TypeRecord:
+    """One <type> entry with numbers parsed and flags packed into a bit mask.
+
+    Missing numeric fields and a missing <flags> element are None. Children the
+    record does not know about are kept as ElementTree elements in `extra`.
+    """
+
+    __slots__ = ('name',) + NUMERIC_FIELDS + ('flags', 'category') + LIST_FIELDS + ('extra',)
+
+    def __init__(self, name, nominal=None, lifetime=None, restock=None, min=None, quantmin=None,
+                 quantmax=None, cost=None, flags=None, category=None, tag=(), usage=(), value=(), extra=()):
+        self.name = name
+        self.nominal = nominal
+        self.lifetime = lifetime
+        self.restock = restock
+        self.min = min
+        self.quantmin = quantmin
+        self.quantmax = quantmax
+        self.cost = cost
+        self.flags = flags
+        self.category = category
+        # Tuples, so a mass edit replaces them instead of sharing mutable lists
+        self.tag = tuple(tag)
+        self.usage = tuple(usage)
+        self.value = tuple(value)
+        self.extra = tuple(extra)
+
+    @classmethod
+    def from_element(cls, element):
+        record = cls(element.get('name'))
+        lists = {field: [] for field in LIST_FIELDS}
+        extra = []
+        for child in element:
+            tag = child.tag
+            if tag in NUMERIC_FIELDS and getattr(record, tag) is None:
+                setattr(record, tag, parse_int(child.text))
+            elif tag == 'flags' and record.flags is None and set(child.attrib) <= set(FLAG_NAMES):
+                mask = 0
+                for bit, flag in enumerate(FLAG_NAMES):
+                    if child.get(flag) == '1':
+                        mask |= 1 << bit
+                record.flags = mask
+            elif tag == 'category' and record.category is None and list(child.attrib) == ['name']:
+                record.category = child.get('name')
+            elif tag in lists and list(child.attrib) == ['name']:
+                lists[tag].append(child.get('name'))
+            else:
+                # e.g. <usage user="..."/> or tags this tool does not edit
+                extra.append(child)
+        record.tag = tuple(lists['tag'])
+        record.usage = tuple(lists['usage'])
+        record.value = tuple(lists['value'])
+        record.extra = tuple(extra)
+        return record
+
+    def to_element(self):
+        element = ET.Element('type', name=self.name)
+        for field in NUMERIC_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                ET.SubElement(element, field).text = str(value)
+        if self.flags is not None:
+            ET.SubElement(element, 'flags', self.flag_attrib())
+        if self.category is not None:
+            ET.SubElement(element, 'category', name=self.category)
+        for field in LIST_FIELDS:
+            for name in getattr(self, field):
+                ET.SubElement(element, field, name=name)
+        element.extend(self.extra)
+        return element
+
+    def get_flag(self, flag):
+        return bool(self.flags and self.flags & (1 << FLAG_NAMES.index(flag)))
+
+    def set_flag(self, flag, enabled):
+        bit = 1 << FLAG_NAMES.index(flag)
+        mask = self.flags or 0
+        self.flags = mask | bit if enabled else mask & ~bit
+
+    def flag_attrib(self):
+        mask = self.flags or 0
+        return {flag: '1' if mask & (1 << bit) else '0' for bit, flag in enumerate(FLAG_NAMES)}
+
+    def to_row(self):
+        """All fields as a plain tuple, cheaper to pickle than the object."""
+        return tuple(getattr(self, slot) for slot in TypeRecord.__slots__)
+
+    @classmethod
+    def from_row(cls, row):
+        record = cls.__new__(cls)
+        for slot, value in zip(cls.__slots__, row):
+            setattr(record, slot, value)
+        return record
+
+    def copy(self):
+        clone = TypeRecord.__new__(TypeRecord)
+        for slot in TypeRecord.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        return clone
+
+
+def records_from_bytes(data):
+    """Parse types XML into (root tag, root attributes, list of TypeRecord)."""
+    root = ET.fromstring(data)
+    records = [TypeRecord.from_element(element) for element in root.findall('type')]
+    return root.tag, dict(root.attrib), records
+
+
+def iter_records(stream, on_root=None):
+    """Yield TypeRecords from a binary stream with iterparse, dropping each <type> once parsed.
+
+    on_root(tag, attrib) is called as soon as the root element opens.
+    """
+    depth = 0
+    root = None
+    for event, element in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if depth == 0:
+                root = element
+                if on_root is not None:
+                    on_root(element.tag, dict(element.attrib))
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1 and element.tag == 'type':
+            yield TypeRecord.from_element(element)
+            root.remove(element)
+
+
+def load_records(file_name):
+    with open(file_name, 'rb') as f:
+        return records_from_bytes(f.read())
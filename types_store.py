@@ -0,0 +1,516 @@
+import logging
+import os
+from contextlib import contextmanager
+
+import mass_engine
+
+from economy_core import types_files
+from parallel_load import read_types_file, load_types_files, types_files_in_folder
+from xml_writer import write_types
+from type_index import FACETS, TypeIndex
+from atomic_file import atomic_write
+from commands import UndoLog
+from baseline_store import BaselineStore
+from edit_journal import JOURNAL_SUFFIX, EditJournal, read_journal
+from type_merge import OURS, merge_types
+from type_record import TypeRecord
+
+# Qt-free and shared with the command line, so progress goes to logging, not stdout
+log = logging.getLogger(__name__)
+
+
+class TypesFile:
+    """One loaded types file: its root element, the bytes it was loaded from and
+    its records in document order (duplicates included, new records at the end)."""
+
+    def __init__(self, path, root_tag='types', root_attrib=None, source=None):
+        self.path = path
+        self.root_tag = root_tag
+        self.root_attrib = root_attrib or {}
+        self.source = source
+        self.records = []
+
+
+class TypesStore:
+    """The loaded types without any Qt: records, index, change batches, undo
+    history and saving. XMLLogic builds the GUI on top of it and the command
+    line uses it directly.
+
+    A store holds one types file, or in project mode every types file that a
+    cfgeconomycore.xml references, merged into one index. Each record
+    remembers its file, and saving a project rewrites only the changed files.
+    """
+
+    def __init__(self):
+        # The opened types file, or cfgeconomycore.xml in project mode
+        self.file_name = None
+        self.project = False
+        self.files = []
+        self.record_files = {}
+        self.changed_files = set()
+        self.records = {}
+        # Later entries with an already used name; not editable, but saved back unchanged
+        self.duplicates = []
+        # (path, reason) of the files of a folder that could not be read and were left out
+        self.skipped_files = []
+        # Facet postings, numeric ranges and names, updated on every mark_changed
+        self.index = TypeIndex()
+        # Records changed since the last save
+        self.dirty_records = set()
+        # Record-level undo history for every item; a batch is one step
+        self.undo_log = UndoLog()
+        self._pending_undo = []
+        self._replaying = False
+        self.initial_values = {}
+        # Vanilla values from Config/types.xml for "Standard", loaded on first use
+        self.baseline = None
+        # Number of rotated copies (file.bak1..bakN) kept by each save; 0 disables them
+        self.backup_count = 0
+        # Crash recovery journal of the unsaved edits, see open_journal()
+        self.journal = None
+        self._pending_journal = []
+
+        # Batched change notifications (see batch())
+        self._batch_depth = 0
+        self._pending_changes = {}
+        self._pending_index_changes = set()
+        self._pending_merge_key = None
+        # While listeners run: the facets, range fields and 'name' the batch changed in the index,
+        # and whether a record moved to another facet
+        self.changed_fields = set()
+        self.facets_changed = False
+        self._items_changed_listeners = []
+
+    def reset(self):
+        """Forget the loaded file, before loading another one."""
+        self.close_journal()
+        self.file_name = None
+        self.project = False
+        self.files = []
+        self.record_files = {}
+        self.changed_files = set()
+        self.dirty_records = set()
+        self.records = {}
+        self.duplicates = []
+        self.skipped_files = []
+        self.index.clear()
+        self.undo_log.clear()
+
+    @property
+    def root_attrib(self):
+        return self.files[0].root_attrib if self.files else {}
+
+    def load(self, file_name):
+        path, root_tag, root_attrib, records, source = read_types_file(file_name)
+        self.reset()
+        self._add_records(records, self.open_file(path, root_tag, root_attrib, source))
+        self.file_name = file_name
+        self.initial_values = self._get_initial_values()
+
+    def load_project(self, core_file, max_workers=None):
+        """Load every types file referenced by cfgeconomycore.xml, parsed in parallel."""
+        self._load_files(core_file, load_types_files(types_files(core_file), max_workers))
+
+    def load_folder(self, folder, max_workers=None):
+        """Load every types file below folder (e.g. a mod pack), parsed in parallel."""
+        skipped = []
+        results = load_types_files(types_files_in_folder(folder), max_workers, skipped=skipped)
+        self._load_files(folder, [result for result in results if result[1] == 'types'])
+        self.skipped_files = skipped
+
+    def _load_files(self, file_name, results):
+        self.reset()
+        self.add_loaded_files(results)
+        self.project = True
+        self.file_name = file_name
+        self.initial_values = self._get_initial_values()
+
+    def add_loaded_files(self, results):
+        """Merge read_types_file() results, in order; earlier files win on duplicate names."""
+        names = []
+        for path, root_tag, root_attrib, records, source in results:
+            names.extend(self._add_records(records, self.open_file(path, root_tag, root_attrib, source)))
+        return names
+
+    def open_file(self, path, root_tag='types', root_attrib=None, source=None):
+        types_file = TypesFile(path, root_tag, root_attrib, source)
+        self.files.append(types_file)
+        return types_file
+
+    def duplicate_report(self):
+        """(name, file that was kept, file whose entry was ignored) for every duplicate type name."""
+        return [(record.name, self.file_of(self.records.get(record.name)), self.file_of(record))
+                for record in self.duplicates]
+
+    def file_of(self, record):
+        types_file = self.record_files.get(record)
+        return types_file.path if types_file is not None else None
+
+    def _add_records(self, records, types_file=None):
+        # Name -> TypeRecord, so lookups don't rescan the whole file.
+        # On duplicate names the first entry wins, same as the old findall lookup.
+        types_file = types_file or self.files[-1]
+        types_file.records.extend(records)
+        added = []
+        for record in records:
+            self.record_files[record] = types_file
+            if record.name in self.records:
+                self.duplicates.append(record)
+                continue
+            self.records[record.name] = record
+            added.append(record)
+        self.index.add_many(added)
+        self.undo_log.track(added)
+        return [record.name for record in added]
+
+    def get_item_by_name(self, name):
+        return self.records.get(name)
+
+    def get_facet_count(self, facet, key):
+        return self.index.count(facet, key)
+
+    def add_item(self, record, types_file=None):
+        """Add a new type, by default to the first file."""
+        if types_file is None:
+            types_file = self.files[0] if self.files else self.open_file(None)
+        types_file.records.append(record)
+        self.record_files[record] = types_file
+        self.changed_files.add(types_file)
+        self.records[record.name] = record
+        self.index.add(record)
+        self.undo_log.track([record])
+        self._journal([('add', self.files.index(types_file), record.to_row())])
+        self._membership_changed(record.name)
+
+    def remove_item(self, name):
+        removed = self.remove_items([name])
+        return removed[0] if removed else None
+
+    def remove_items(self, names):
+        """Remove types by name; the record list of each file is filtered once,
+        not searched once per type. Returns the removed records."""
+        removed = []
+        files = set()
+        with self.batch():
+            for name in names:
+                record = self.records.pop(name, None)
+                if record is None:
+                    continue
+                removed.append(record)
+                files.add(self.record_files.pop(record))
+                self.dirty_records.discard(record)
+                self.index.remove(record)
+                self.undo_log.forget(record)
+                self._journal([('remove', name)])
+                self._membership_changed(name)
+            gone = set(removed)
+            for types_file in files:
+                types_file.records = [record for record in types_file.records if record not in gone]
+            self.changed_files |= files
+        return removed
+
+    def _membership_changed(self, name):
+        # A type that comes or goes changes the facet counts and what the filters show
+        self._pending_changes[name] = None
+        self._pending_index_changes.update(FACETS)
+        if self._batch_depth == 0:
+            self._flush_changes()
+
+    def rename_item(self, record, new_name):
+        """Returns False if the name did not change or another type already has it."""
+        old_name = record.name
+        if new_name == old_name or new_name in self.records:
+            return False
+        if self.records.get(old_name) is record:
+            del self.records[old_name]
+        record.name = new_name
+        self.records[new_name] = record
+        self.dirty_records.add(record)
+        self.changed_files.add(self.record_files[record])
+        self._pending_index_changes |= self.index.update(record)
+        return True
+
+    def add_items_changed_listener(self, callback):
+        """callback(names) is called with the list of changed type names."""
+        self._items_changed_listeners.append(callback)
+
+    def remove_items_changed_listener(self, callback):
+        if callback in self._items_changed_listeners:
+            self._items_changed_listeners.remove(callback)
+
+    def mark_changed(self, name):
+        record = self.records.get(name)
+        if record is not None:
+            self.dirty_records.add(record)
+            self.changed_files.add(self.record_files[record])
+            self._pending_index_changes |= self.index.update(record)
+            changes = self.undo_log.diff(record)
+            if not self._replaying:
+                self._pending_undo.extend(changes)
+            self._journal([('set', change[0], change[1], change[3]) for change in changes])
+        self._pending_changes[name] = None
+        if self._batch_depth == 0:
+            self._flush_changes()
+
+    def begin_batch(self):
+        self._batch_depth += 1
+
+    def end_batch(self):
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._flush_changes()
+
+    @contextmanager
+    def batch(self, merge_key=None):
+        """Group mutations so listeners get one "items changed" call at the end.
+
+        Consecutive batches with the same merge_key become one undo step.
+        """
+        self.begin_batch()
+        if merge_key is not None:
+            self._pending_merge_key = merge_key
+        try:
+            yield self
+        finally:
+            self.end_batch()
+
+    def _flush_changes(self):
+        self._flush_journal()
+        if self._pending_undo:
+            names = list(self._pending_changes)
+            description = f"Edit {names[0]}" if len(names) == 1 else f"Edit {len(names)} items"
+            self.undo_log.push(self._pending_undo, description, self._pending_merge_key)
+            self._pending_undo = []
+        self._pending_merge_key = None
+        if not self._pending_changes:
+            return
+        names = list(self._pending_changes)
+        self._pending_changes = {}
+        self.changed_fields = self._pending_index_changes
+        self._pending_index_changes = set()
+        self.facets_changed = not self.changed_fields.isdisjoint(FACETS)
+        for callback in list(self._items_changed_listeners):
+            callback(names)
+
+    def open_journal(self, recover=None):
+        """Start journaling the edits of the loaded files to file_name.journal.
+
+        If a previous session left unsaved edits of the same files there,
+        recover(count) is asked first and replays them when it returns True.
+        """
+        path = self.file_name + JOURNAL_SUFFIX
+        stamp = self._journal_stamp()
+        entries = read_journal(path, stamp)
+        replay = bool(entries) and recover is not None and recover(len(entries))
+        # Opening the journal empties the file, so only after the answer
+        self.journal = EditJournal(path, stamp)
+        if replay:
+            self.replay_journal(entries)
+        return len(entries)
+
+    def close_journal(self):
+        if self.journal is not None:
+            # Nothing unsaved left: the journal has nothing to recover
+            self.journal.close(remove=not self.changed_files)
+            self.journal = None
+            self._pending_journal = []
+
+    def _journal_stamp(self):
+        stamp = []
+        for types_file in self.files:
+            if types_file.path is not None:
+                stat = os.stat(types_file.path)
+                stamp.append((types_file.path, stat.st_size, stat.st_mtime_ns))
+        return tuple(stamp)
+
+    def _journal(self, entries):
+        if self.journal is not None and entries:
+            self._pending_journal.extend(entries)
+            if self._batch_depth == 0:
+                self._flush_journal()
+
+    def _flush_journal(self):
+        if self._pending_journal:
+            if self.journal.error is not None:
+                # The writer is gone, stop journaling instead of queueing edits nobody writes
+                error, self.journal = self.journal.error, None
+                self._pending_journal = []
+                self.journal_failed(error)
+                return
+            self.journal.append(self._pending_journal)
+            self._pending_journal = []
+
+    def journal_failed(self, error):
+        """Called once when the journal can't be written; the edits are no longer crash-safe."""
+
+    def replay_journal(self, entries):
+        """Re-apply journaled edits, as one undoable step."""
+        with self.batch():
+            for entry in entries:
+                if entry[0] == 'set':
+                    self._set_field(*entry[1:])
+                elif entry[0] == 'add':
+                    types_file = self.files[entry[1]] if entry[1] < len(self.files) else None
+                    self.add_item(TypeRecord.from_row(entry[2]), types_file)
+                else:
+                    self.remove_item(entry[1])
+        log.info("Recovered %d journaled edits", len(entries))
+
+    def _get_initial_values(self):
+        initial_values = {}
+        for name, record in self.records.items():
+            initial_values[name] = {
+                'nominal': record.nominal,
+                'min': record.min,
+                'lifetime': record.lifetime,
+                'restock': record.restock
+            }
+        return initial_values
+
+    def _write_file(self, types_file, file_name):
+        if types_file.source is not None:
+            # Only the <type> blocks of changed records are regenerated, the rest of
+            # the loaded file is copied byte for byte
+            data, spans, close_offset = types_file.source.render(types_file.records, self.dirty_records)
+            with atomic_write(file_name, 'wb', backups=self.backup_count) as f:
+                f.write(data)
+            types_file.source.commit(data, spans, close_offset)
+        else:
+            # Streams one <type> block at a time instead of tostring + minidom + toprettyxml,
+            # into a temp file that only replaces file_name once it is complete and fsynced
+            with atomic_write(file_name, backups=self.backup_count) as f:
+                write_types(f, types_file.root_tag, types_file.root_attrib, types_file.records)
+
+    def standard_values(self, field):
+        """name -> vanilla value of field from Config/types.xml. Without that file,
+        the values the opened file had at load (nominal/min/lifetime/restock only)."""
+        if self.baseline is None:
+            try:
+                self.baseline = BaselineStore.load()
+            except (OSError, SyntaxError) as e:
+                log.warning("No baseline types: %s", e)
+                self.baseline = False
+        if self.baseline:
+            return self.baseline.column(field)
+        return {name: values[field] for name, values in self.initial_values.items() if field in values}
+
+    def reset_to_standard(self, records, fields):
+        """Reset fields of records to their vanilla values, as one batch; returns the changed records."""
+        changed = set()
+        with self.batch():
+            for field in fields:
+                for record in mass_engine.reset_to_baseline(records, field, self.standard_values(field)):
+                    changed.add(record)
+                    self.mark_changed(record.name)
+        return changed
+
+    def merge_update(self, base, theirs, prefer=OURS):
+        """Three-way merge of a game update into the loaded types: base is the old
+        vanilla (name -> TypeRecord), theirs the new vanilla records. Field changes
+        are one undo step; added and removed types go through add/remove_item.
+        Returns the conflicts (see type_merge)."""
+        merged, conflicts = merge_types(base, theirs, self.records, prefer)
+        kept = set()
+        with self.batch():
+            for record in merged:
+                kept.add(record.name)
+                current = self.records.get(record.name)
+                if current is None:
+                    self.add_item(record)
+                    continue
+                changed = False
+                for field in TypeRecord.__slots__[1:-1]:
+                    value = getattr(record, field)
+                    if getattr(current, field) != value:
+                        setattr(current, field, value)
+                        changed = True
+                if changed:
+                    self.mark_changed(current.name)
+            self.remove_items([name for name in self.records if name not in kept])
+        log.info("Merged update: %d types, %d conflicts", len(merged), len(conflicts))
+        return conflicts
+
+    def save(self, file_name):
+        """Write a single-file store to file_name."""
+        types_file = self.files[0]
+        self._write_file(types_file, file_name)
+        log.info("Saved %s, %d changed types", file_name, len(self.dirty_records))
+        self.dirty_records = set()
+        self.changed_files = set()
+        # Written elsewhere, the loaded file is unchanged on disk and the
+        # journal stamped to it still holds every edit made to it
+        if types_file.path is not None and os.path.samefile(types_file.path, file_name):
+            self._truncate_journal()
+
+    def save_changed_files(self):
+        """Write back, in place, only the files with changed, added or removed types."""
+        saved = []
+        for types_file in self.files:
+            if types_file in self.changed_files:
+                self._write_file(types_file, types_file.path)
+                saved.append(types_file.path)
+        log.info("Saved %d of %d files, %d changed types", len(saved), len(self.files), len(self.dirty_records))
+        self.dirty_records = set()
+        self.changed_files = set()
+        self._truncate_journal()
+        return saved
+
+    def _truncate_journal(self):
+        if self.journal is not None:
+            self.journal.truncate(self._journal_stamp())
+
+    def export(self, file_name):
+        """Write every type of the store (all files merged) into one new file."""
+        records = list(self.records.values())
+        with atomic_write(file_name, backups=self.backup_count) as f:
+            write_types(f, 'types', {}, records)
+        log.info("Exported %d types to %s", len(records), file_name)
+
+    def filter_records(self, filters, ranges=None, search=None):
+        """Set of records matching {facet: keys} (OR within a facet, AND across),
+        {field: (low, high)} numeric ranges and the name search text, or None
+        when nothing filters."""
+        return self.index.query(filters, ranges, search)
+
+    def get_filtered_items(self, selected_categories, filters=None, search=None):
+        filters = dict(filters or {})
+        filters['category'] = selected_categories or ()
+        matched = self.filter_records(filters, search=search)
+        if matched is None:
+            return list(self.records.values())
+        return [record for record in self.records.values() if record in matched]
+
+    def undo(self):
+        if self.undo_log.can_undo():
+            command = self.undo_log.take_undo()
+            log.info("Undo: %s", command.description)
+            self._replay(reversed(command.changes), undo=True)
+
+    def redo(self):
+        if self.undo_log.can_redo():
+            command = self.undo_log.take_redo()
+            log.info("Redo: %s", command.description)
+            self._replay(command.changes, undo=False)
+
+    def _replay(self, changes, undo):
+        """Write old (undo) or new (redo) values back; one batch, not recorded again."""
+        self._replaying = True
+        try:
+            with self.batch():
+                for name, field, old, new in changes:
+                    if field == 'name':
+                        name = new if undo else old  # the name the type has now
+                    self._set_field(name, field, old if undo else new)
+        finally:
+            self._replaying = False
+
+    def _set_field(self, name, field, value):
+        record = self.records.get(name)
+        if record is None:
+            return
+        if field == 'name':
+            self.rename_item(record, value)
+            name = value
+        else:
+            setattr(record, field, value)
+        self.mark_changed(name)
@@ -1,25 +1,36 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget,
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListView,
     QLabel, QCheckBox, QLineEdit, QScrollArea, QShortcut,
-    QComboBox, QListWidgetItem, QToolBar, QAction, QToolButton, QMenu, QFrame, QSpacerItem, QSizePolicy
+    QComboBox, QToolBar, QProgressBar, QMessageBox, QAction, QToolButton, QMenu, QFrame, QSpacerItem, QSizePolicy
 )
-from PyQt5.QtGui import QFont, QKeySequence, QIcon
-from PyQt5.QtCore import Qt, QPropertyAnimation, QSize
-import qtawesome as qta
+from PyQt5.QtGui import QFont, QKeySequence, QIcon, QIntValidator
+from PyQt5.QtCore import Qt, QPropertyAnimation, QSize, QTimer
 from xml_logic import XMLLogic
-from mass_edit import MassEditDialog
+from list_model import TypeListModel, TypeFilterProxyModel
+from details_form import DetailsForm
 
 class XMLViewer(QWidget):
     def __init__(self):
         super().__init__()
 
         self.xml_logic = XMLLogic(self)
-        self.selected_items = set()
         self.lifetime_slider_value = 100
         self.restock_slider_value = 100
         self.selected_categories = set(self.xml_logic.category_options)
         self.category_checkboxes = {}
+        # Usage/value/tag/flag filters: nothing ticked means the facet does not filter
+        self.selected_facets = {'usage': set(), 'value': set(), 'tag': set(), 'flags': set()}
+        self.facet_checkboxes = {}
+        # Numeric range filters: field -> (low, high), None for an open end
+        self.selected_ranges = {}
+        self.range_inputs = {}
+        self.search_text = ''
+        # (widget or action, icon name); set by load_icons() once the window is up,
+        # qtawesome loads its icon fonts on import
+        self.pending_icons = []
         self.initUI()
+        self.xml_logic.add_items_changed_listener(self.on_items_changed)
+        QTimer.singleShot(0, self.load_icons)
 
     def initUI(self):
         self.setWindowTitle('DayZ StandAlone XML Viewer')
@@ -47,23 +58,27 @@ class XMLViewer(QWidget):
 
         # Create the hamburger button
         self.hamburger_button = QPushButton(self)
-        self.hamburger_button.setIcon(qta.icon('fa.bars'))
         self.hamburger_button.setFixedSize(30, 30)
+        self.pending_icons.append((self.hamburger_button, 'fa.bars'))
         self.hamburger_button.clicked.connect(self.toggle_filter_panel)
         left_layout.addWidget(self.hamburger_button)
 
         # Add left column to main layout
         main_layout.addWidget(self.left_column)
 
-        # Create the filter panel
-        self.filter_panel = QFrame(self)
+        # Create the filter panel, scrollable since the facet sections don't fit the window
+        self.filter_panel = QScrollArea(self)
         self.filter_panel.setFrameShape(QFrame.NoFrame)
+        self.filter_panel.setWidgetResizable(True)
+        self.filter_panel.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.filter_panel.setFixedWidth(0)  # Initially hidden
         filter_layout = QVBoxLayout()
         filter_layout.setContentsMargins(0, 0, 0, 0)
         filter_layout.setSpacing(10)
         filter_layout.setAlignment(Qt.AlignTop)
-        self.filter_panel.setLayout(filter_layout)
+        filter_content = QFrame()
+        filter_content.setLayout(filter_layout)
+        self.filter_panel.setWidget(filter_content)
 
         # Add collapsible functionality to the category header
         self.category_toggle_button = self.create_toggle_button("Category Filter", self.toggle_category_section)
@@ -92,6 +107,26 @@ class XMLViewer(QWidget):
         # Add usage filter container
         self.usage_container = self.create_filter_container()
         filter_layout.addWidget(self.usage_container)
+        self.add_facet_checkboxes('usage', self.xml_logic.usage_options, self.usage_container)
+
+        # Value, tag and flag filters work like the usage filter
+        self.value_toggle_button = self.create_toggle_button("Value Filter", self.toggle_value_section)
+        filter_layout.addWidget(self.value_toggle_button)
+        self.value_container = self.create_filter_container()
+        filter_layout.addWidget(self.value_container)
+        self.add_facet_checkboxes('value', self.xml_logic.value_options, self.value_container)
+
+        self.tag_toggle_button = self.create_toggle_button("Tag Filter", self.toggle_tag_section)
+        filter_layout.addWidget(self.tag_toggle_button)
+        self.tag_container = self.create_filter_container()
+        filter_layout.addWidget(self.tag_container)
+        self.add_facet_checkboxes('tag', self.xml_logic.tag_options, self.tag_container)
+
+        self.flags_toggle_button = self.create_toggle_button("Flags Filter", self.toggle_flags_section)
+        filter_layout.addWidget(self.flags_toggle_button)
+        self.flags_container = self.create_filter_container()
+        filter_layout.addWidget(self.flags_container)
+        self.add_facet_checkboxes('flags', self.xml_logic.flag_options, self.flags_container)
 
         # Add collapsible functionality to the nominal filter
         self.nominal_toggle_button = self.create_toggle_button("Nominal Filter", self.toggle_nominal_section)
@@ -100,6 +135,7 @@ class XMLViewer(QWidget):
         # Add nominal filter container
         self.nominal_container = self.create_filter_container()
         filter_layout.addWidget(self.nominal_container)
+        self.add_range_inputs('nominal', self.nominal_container)
 
         # Add collapsible functionality to the min filter
         self.min_toggle_button = self.create_toggle_button("Min Filter", self.toggle_min_section)
@@ -108,6 +144,20 @@ class XMLViewer(QWidget):
         # Add min filter container
         self.min_container = self.create_filter_container()
         filter_layout.addWidget(self.min_container)
+        self.add_range_inputs('min', self.min_container)
+
+        # Lifetime and restock ranges are in seconds, as in the XML
+        self.lifetime_toggle_button = self.create_toggle_button("Lifetime Filter", self.toggle_lifetime_section)
+        filter_layout.addWidget(self.lifetime_toggle_button)
+        self.lifetime_container = self.create_filter_container()
+        filter_layout.addWidget(self.lifetime_container)
+        self.add_range_inputs('lifetime', self.lifetime_container, "s")
+
+        self.restock_toggle_button = self.create_toggle_button("Restock Filter", self.toggle_restock_section)
+        filter_layout.addWidget(self.restock_toggle_button)
+        self.restock_container = self.create_filter_container()
+        filter_layout.addWidget(self.restock_container)
+        self.add_range_inputs('restock', self.restock_container, "s")
 
         filter_layout.addStretch(1)
 
@@ -141,10 +191,23 @@ class XMLViewer(QWidget):
         list_header_container.setFixedHeight(40)
         middle_layout.addWidget(list_header_container)
 
-        # Create the list widget
-        self.list_widget = QListWidget(self)
-        self.list_widget.itemClicked.connect(self.displayItemDetails)
-        middle_layout.addWidget(self.list_widget)
+        # Progress of the background XML loading, hidden when idle
+        self.load_progress_bar = QProgressBar(self)
+        self.load_progress_bar.setRange(0, 100)
+        self.load_progress_bar.setFixedHeight(12)
+        self.load_progress_bar.setTextVisible(False)
+        self.load_progress_bar.hide()
+        middle_layout.addWidget(self.load_progress_bar)
+
+        # Create the list view over the types model, filtered by category through the proxy
+        self.list_model = TypeListModel(self)
+        self.proxy_model = TypeFilterProxyModel(self.xml_logic, self)
+        self.proxy_model.setSourceModel(self.list_model)
+        self.list_view = QListView(self)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setModel(self.proxy_model)
+        self.list_view.clicked.connect(self.displayItemDetails)
+        middle_layout.addWidget(self.list_view)
 
         main_layout.addWidget(middle_column)
 
@@ -155,6 +218,9 @@ class XMLViewer(QWidget):
         self.details_widget = QWidget()
         self.details_layout = QVBoxLayout()
         self.details_widget.setLayout(self.details_layout)
+        self.details_form = DetailsForm(self.xml_logic, self.details_widget)
+        self.details_layout.addWidget(self.details_form)
+        self.details_layout.addStretch(1)
         self.scroll_area.setWidget(self.details_widget)
 
         main_layout.addWidget(self.scroll_area)
@@ -187,23 +253,82 @@ class XMLViewer(QWidget):
         redo_shortcut = QShortcut(QKeySequence('Ctrl+Shift+Z'), self)
         redo_shortcut.activated.connect(self.redo)
 
+        search_shortcut = QShortcut(QKeySequence('Ctrl+F'), self)
+        search_shortcut.activated.connect(self.focus_search)
+
     def addToolBarActions(self):
-        open_action = QAction(qta.icon('fa.folder-open'), 'Open XML', self)
+        open_action = QAction('Open XML', self)
         open_action.triggered.connect(self.openFile)
         self.toolbar.addAction(open_action)
+        self.pending_icons.append((open_action, 'fa.folder-open'))
+
+        open_project_action = QAction('Open Project', self)
+        open_project_action.setToolTip("Open cfgeconomycore.xml and every types file it references")
+        open_project_action.triggered.connect(self.openProject)
+        self.toolbar.addAction(open_project_action)
+        self.pending_icons.append((open_project_action, 'fa.sitemap'))
 
-        save_action = QAction(qta.icon('fa.save'), 'Save XML', self)
+        open_folder_action = QAction('Open Folder', self)
+        open_folder_action.setToolTip("Open every types XML in a folder, e.g. a mod pack")
+        open_folder_action.triggered.connect(self.openFolder)
+        self.toolbar.addAction(open_folder_action)
+        self.pending_icons.append((open_folder_action, 'fa.folder'))
+
+        save_action = QAction('Save XML', self)
         save_action.triggered.connect(self.saveFile)
         self.toolbar.addAction(save_action)
+        self.pending_icons.append((save_action, 'fa.save'))
 
-        save_as_action = QAction(qta.icon('fa.save'), 'Save As', self)
+        save_as_action = QAction('Save As', self)
         save_as_action.triggered.connect(self.saveFileAs)
         self.toolbar.addAction(save_as_action)
+        self.pending_icons.append((save_as_action, 'fa.save'))
 
         # Add MassEdit button to the toolbar
-        mass_edit_action = QAction(qta.icon('fa.edit'), 'Mass Edit', self)
+        mass_edit_action = QAction('Mass Edit', self)
         mass_edit_action.triggered.connect(self.openMassEditDialog)
         self.toolbar.addAction(mass_edit_action)
+        self.pending_icons.append((mass_edit_action, 'fa.edit'))
+
+        diff_action = QAction('Diff', self)
+        diff_action.setToolTip("Compare the loaded types with Config/types.xml or another file")
+        diff_action.triggered.connect(self.openDiffDialog)
+        self.toolbar.addAction(diff_action)
+        self.pending_icons.append((diff_action, 'fa.exchange'))
+
+        merge_action = QAction('Merge Update', self)
+        merge_action.setToolTip("Re-apply the edits to a new vanilla types.xml after a game update")
+        merge_action.triggered.connect(self.mergeUpdate)
+        self.toolbar.addAction(merge_action)
+        self.pending_icons.append((merge_action, 'fa.code-fork'))
+
+        rules_action = QAction('Apply Rules', self)
+        rules_action.setToolTip("Apply an economy preset: rules that select types and scale their values (JSON/YAML)")
+        rules_action.triggered.connect(self.applyRules)
+        self.toolbar.addAction(rules_action)
+        self.pending_icons.append((rules_action, 'fa.sliders'))
+
+        # Search box: the list is re-filtered once typing pauses, not on every keystroke
+        spacer = QWidget(self)
+        spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+        self.toolbar.addWidget(spacer)
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("Search by name...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setFixedWidth(250)
+        self.search_edit.textChanged.connect(self.schedule_search)
+        self.toolbar.addWidget(self.search_edit)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.apply_search)
+
+    def load_icons(self):
+        import qtawesome as qta
+        for target, name in self.pending_icons:
+            target.setIcon(qta.icon(name))
+        self.pending_icons = []
 
     def create_toggle_button(self, text, slot):
         button = QToolButton(self)
@@ -230,12 +355,27 @@ class XMLViewer(QWidget):
     def toggle_usage_section(self):
         self.toggle_section(self.usage_toggle_button, self.usage_container)
 
+    def toggle_value_section(self):
+        self.toggle_section(self.value_toggle_button, self.value_container)
+
+    def toggle_tag_section(self):
+        self.toggle_section(self.tag_toggle_button, self.tag_container)
+
+    def toggle_flags_section(self):
+        self.toggle_section(self.flags_toggle_button, self.flags_container)
+
     def toggle_nominal_section(self):
         self.toggle_section(self.nominal_toggle_button, self.nominal_container)
 
     def toggle_min_section(self):
         self.toggle_section(self.min_toggle_button, self.min_container)
 
+    def toggle_lifetime_section(self):
+        self.toggle_section(self.lifetime_toggle_button, self.lifetime_container)
+
+    def toggle_restock_section(self):
+        self.toggle_section(self.restock_toggle_button, self.restock_container)
+
     def toggle_section(self, button, container):
         if button.isChecked():
             button.setArrowType(Qt.DownArrow)
@@ -245,9 +385,60 @@ class XMLViewer(QWidget):
             container.hide()
 
     def update_category_filter_text(self):
+        # Counts come from the histograms XMLLogic keeps, no rescan of the records
         for category, checkbox in self.category_checkboxes.items():
-            count = len(self.xml_logic.get_filtered_items([category]))
+            count = self.xml_logic.get_facet_count('category', category)
             checkbox.setText(f"{category} ({count})")
+        self.category_all_checkbox.setText(f"All ({len(self.xml_logic.records)})")
+
+    def update_facet_filter_text(self):
+        for facet, checkboxes in self.facet_checkboxes.items():
+            for key, checkbox in checkboxes.items():
+                checkbox.setText(f"{key} ({self.xml_logic.get_facet_count(facet, key)})")
+
+    def update_filter_texts(self):
+        self.update_category_filter_text()
+        self.update_facet_filter_text()
+
+    def add_facet_checkboxes(self, facet, options, container):
+        self.facet_checkboxes[facet] = {}
+        for key in options:
+            checkbox = QCheckBox(key, self)
+            checkbox.stateChanged.connect(lambda state, f=facet, k=key: self.toggle_facet_selection(f, k, state))
+            self.facet_checkboxes[facet][key] = checkbox
+            container.layout().addWidget(checkbox)
+
+    def add_range_inputs(self, field, container, unit=""):
+        row = QHBoxLayout()
+        suffix = f" ({unit})" if unit else ""
+        low_edit = QLineEdit(self)
+        low_edit.setPlaceholderText(f"from{suffix}")
+        high_edit = QLineEdit(self)
+        high_edit.setPlaceholderText(f"to{suffix}")
+        for edit in (low_edit, high_edit):
+            edit.setValidator(QIntValidator(self))
+            edit.setFixedHeight(30)
+            edit.textChanged.connect(lambda text, f=field: self.update_range_filter(f))
+            row.addWidget(edit)
+        self.range_inputs[field] = (low_edit, high_edit)
+        container.layout().addLayout(row)
+
+    def update_range_filter(self, field):
+        bounds = []
+        for edit in self.range_inputs[field]:
+            try:
+                bounds.append(int(edit.text()))
+            except ValueError:
+                bounds.append(None)  # empty or just "-" while typing
+        self.selected_ranges[field] = tuple(bounds)
+        self.apply_filters()
+
+    def toggle_facet_selection(self, facet, key, state):
+        if state == Qt.Checked:
+            self.selected_facets[facet].add(key)
+        else:
+            self.selected_facets[facet].discard(key)
+        self.apply_filters()
 
     def toggle_all_categories(self, state):
         checked = state == Qt.Checked
@@ -255,7 +446,7 @@ class XMLViewer(QWidget):
             checkbox.setChecked(checked)
         self.selected_categories = set(self.xml_logic.category_options) if checked else set()
         self.update_category_filter_text()
-        self.loadXMLItems()
+        self.apply_filters()
 
     def toggle_category_selection(self, state):
         checkbox = self.sender()
@@ -268,7 +459,7 @@ class XMLViewer(QWidget):
         all_checked = all(checkbox.isChecked() for checkbox in self.category_checkboxes.values())
         self.category_all_checkbox.setChecked(all_checked)
         self.update_category_filter_text()
-        self.loadXMLItems()
+        self.apply_filters()
 
     def toggle_filter_panel(self):
         current_width = self.filter_panel.width()
@@ -281,45 +472,122 @@ class XMLViewer(QWidget):
         self.animation.start()
 
     def select_visible_items(self, state):
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            item.setCheckState(state)
+        self.list_model.set_checked(self.proxy_model.visible_names(), state == Qt.Checked)
 
     def loadXMLItems(self):
-        if self.xml_logic.xml_root is None:
+        if self.xml_logic.file_name is None:
             return
 
-        current_selected_items = {self.list_widget.item(i).text() for i in range(self.list_widget.count()) if self.list_widget.item(i).checkState() == Qt.Checked}
-        self.selected_items.update(current_selected_items)
+        # Rebuild the model only when a file is loaded; filters go through apply_filters
+        self.list_model.set_names(self.xml_logic.records)
+        self.apply_filters()
 
-        self.list_widget.clear()
-        for item in self.xml_logic.get_filtered_items(self.selected_categories):
-            list_item = QListWidgetItem(item.get('name'))
-            list_item.setFlags(list_item.flags() | Qt.ItemIsUserCheckable)
-            if item.get('name') in self.selected_items:
-                list_item.setCheckState(Qt.Checked)
-            else:
-                list_item.setCheckState(Qt.Unchecked)
-            self.list_widget.addItem(list_item)
+    def apply_filters(self):
+        # All active facets resolve through set intersections in the XMLLogic index
+        filters = dict(self.selected_facets)
+        filters['category'] = self.selected_categories
+        self.proxy_model.set_visible_records(
+            self.xml_logic.filter_records(filters, self.selected_ranges, self.search_text))
+        self.update_filter_texts()
 
-        self.update_category_filter_text()
+    def schedule_search(self, text):
+        self.search_timer.start()  # restarts while the user keeps typing
+
+    def apply_search(self):
+        text = self.search_edit.text().strip()
+        if text != self.search_text:
+            self.search_text = text
+            self.apply_filters()
+
+    def focus_search(self):
+        self.search_edit.setFocus()
+        self.search_edit.selectAll()
 
     def select_all_items(self):
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            item.setCheckState(Qt.Checked)
-            self.selected_items.add(item.text())
+        self.list_model.set_checked(self.proxy_model.visible_names(), True)
 
     def deselect_all_items(self):
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            item.setCheckState(Qt.Unchecked)
-            self.selected_items.discard(item.text())
+        self.list_model.set_checked(self.proxy_model.visible_names(), False)
 
     def openFile(self):
-        file_name = self.xml_logic.openFile()
-        if file_name:
-            self.loadXMLItems()
+        # XMLLogic loads in the background and fills the list through the methods below
+        self.xml_logic.openFile()
+
+    def openProject(self):
+        self.xml_logic.openProject()
+
+    def openFolder(self):
+        self.xml_logic.openFolder()
+
+    def show_duplicates(self, duplicates, limit=20):
+        lines = [f"{name}: {ignored} (kept {kept})" for name, kept, ignored in duplicates[:limit]]
+        if len(duplicates) > limit:
+            lines.append(f"... and {len(duplicates) - limit} more")
+        QMessageBox.warning(self, "Duplicate types",
+                            f"{len(duplicates)} type names appear in more than one file. "
+                            "The first entry is edited, the others are saved back unchanged:\n\n" + "\n".join(lines))
+
+    def show_skipped_files(self, skipped, limit=20):
+        lines = [f"{path}: {reason}" for path, reason in skipped[:limit]]
+        if len(skipped) > limit:
+            lines.append(f"... and {len(skipped) - limit} more")
+        QMessageBox.warning(self, "Skipped files",
+                            f"{len(skipped)} .xml files of the folder could not be read and were left out:\n\n"
+                            + "\n".join(lines))
+
+    def mergeUpdate(self):
+        self.xml_logic.mergeUpdate()
+
+    def applyRules(self):
+        self.xml_logic.applyRules()
+
+    def show_rules_report(self, report):
+        lines = [f"{rule.name}: {selected} selected, {changed} changed" for rule, selected, changed in report]
+        QMessageBox.information(self, "Apply Rules", "\n".join(lines) or "The file has no rules.")
+
+    def show_merge_conflicts(self, conflicts, limit=20):
+        if not conflicts:
+            QMessageBox.information(self, "Merge Update", "Merged without conflicts.")
+            return
+        lines = [str(conflict) for conflict in conflicts[:limit]]
+        if len(conflicts) > limit:
+            lines.append(f"... and {len(conflicts) - limit} more")
+        QMessageBox.warning(self, "Merge conflicts",
+                            f"{len(conflicts)} values were changed by both the update and the edits. "
+                            f"The kept side is shown, check them before saving:\n\n" + "\n".join(lines))
+
+    def ask_recover_journal(self, count):
+        answer = QMessageBox.question(self, "Recover edits",
+                                      f"{count} unsaved edits of this file were left by a previous session "
+                                      "(crash or closed without saving). Recover them?",
+                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        return answer == QMessageBox.Yes
+
+    def closeEvent(self, event):
+        self.xml_logic.saveCurrentItemDetails()
+        self.xml_logic.close_journal()  # flushes the last edits; kept on disk while they are unsaved
+        super().closeEvent(event)
+
+    def show_error(self, message):
+        QMessageBox.critical(self, "Error", message)
+
+    def begin_loading(self):
+        self.clear_details_layout()
+        self.list_model.set_names([])
+        self.load_progress_bar.setValue(0)
+        self.load_progress_bar.show()
+
+    def add_items_to_list(self, names):
+        self.list_model.append_names(names)
+
+    def set_load_progress(self, value):
+        self.load_progress_bar.setValue(value)
+
+    def finish_loading(self, error=None):
+        self.load_progress_bar.hide()
+        self.apply_filters()
+        if error:
+            QMessageBox.critical(self, "Error", f"Could not load the XML file:\n{error}")
 
     def saveFile(self):
         self.xml_logic.saveFile()
@@ -327,35 +595,14 @@ class XMLViewer(QWidget):
     def saveFileAs(self):
         self.xml_logic.saveFileAs()
 
-    def displayItemDetails(self, item):
-        self.xml_logic.displayItemDetails(item)
-        self.list_widget.clearSelection()  # Убираем выделение с объекта
+    def displayItemDetails(self, index):
+        self.xml_logic.displayItemDetails(index.data(Qt.DisplayRole))
+        self.list_view.clearSelection()  # Убираем выделение с объекта
 
     def clear_details_layout(self):
-        for i in reversed(range(self.details_layout.count())):
-            item = self.details_layout.itemAt(i)
-            if item is not None:
-                widget_to_remove = item.widget()
-                if widget_to_remove is not None:
-                    self.details_layout.removeWidget(widget_to_remove)
-                    widget_to_remove.deleteLater()
-
-        if 'usage' in self.xml_logic.details_widgets:
-            for widget, layout in self.xml_logic.details_widgets['usage']:
-                self.xml_logic._remove_layout_with_widgets(layout)
-            del self.xml_logic.details_widgets['usage']
-
-        if 'value' in self.xml_logic.details_widgets:
-            for widget, layout in self.xml_logic.details_widgets['value']:
-                self.xml_logic._remove_layout_with_widgets(layout)
-            del self.xml_logic.details_widgets['value']
-
-        if 'tag' in self.xml_logic.details_widgets:
-            for widget, layout in self.xml_logic.details_widgets['tag']:
-                self.xml_logic._remove_layout_with_widgets(layout)
-            del self.xml_logic.details_widgets['tag']
-
-        self.xml_logic.details_widgets.clear()
+        # The form is kept for the next item, only hidden
+        self.details_form.unbind()
+        self.xml_logic.details_widgets = {}
 
     def undo(self):
         self.xml_logic.undo()
@@ -364,6 +611,7 @@ class XMLViewer(QWidget):
         self.xml_logic.redo()
 
     def openMassEditDialog(self):
+        from mass_edit import MassEditDialog  # imported on first use, keeps it out of startup
         self.xml_logic.saveCurrentItemDetails()  # Сохранить текущий объект перед массовыми изменениями
         self.mass_edit_dialog = MassEditDialog(self.xml_logic, self)
         self.mass_edit_dialog.setModal(False)  # Allow interaction with the main window
@@ -373,39 +621,61 @@ class XMLViewer(QWidget):
         self.mass_edit_dialog.finished.connect(self.onMassEditDialogClosed)  # Connect the finished signal to update the active item
         self.mass_edit_dialog.show()
 
+    def openDiffDialog(self):
+        from diff_panel import DiffDialog  # imported on first use, like the Mass Edit dialog
+        self.diff_dialog = DiffDialog(self.xml_logic, self)
+        self.diff_dialog.setModal(False)
+        self.diff_dialog.show()
+        self.diff_dialog.compare()
+
     def force_update_active_item(self):
         self.xml_logic.saveCurrentItemDetails()
         self.clear_details_layout()  # Очищаем текущие детали
 
+    def on_items_changed(self, names):
+        """Single refresh after a batch of edits from XMLLogic."""
+        print(f"Items changed: {len(names)}")  # Debug info
+        self.list_model.refresh_names(names)
+        if self.filters_affected(self.xml_logic.changed_fields):
+            self.apply_filters()  # e.g. a category changed, the row may have to hide or show
+        else:
+            self.update_filter_texts()
+        self.xml_logic.refresh_current_item(set(names))
+
+    def filters_affected(self, changed_fields):
+        """True if an edit of changed_fields can change which rows the filters show."""
+        if self.xml_logic.facets_changed:
+            return True
+        if 'name' in changed_fields and self.search_text:
+            return True
+        return any(field in changed_fields and bounds != (None, None)
+                   for field, bounds in self.selected_ranges.items())
+
     def update_item_in_list(self, item_name):
         """Обновляет элемент в списке на основе имени элемента."""
-        for i in range(self.list_widget.count()):
-            list_item = self.list_widget.item(i)
-            if list_item.text() == item_name:
-                print(f"Updating item in list: {item_name}")  # Debug info
-                self.displayItemDetails(list_item)
-                break
-            
+        self.list_model.refresh_names([item_name])
+
+    def rename_item_in_list(self, old_name, new_name):
+        self.list_model.rename(old_name, new_name)
+
+    def add_item_to_list(self, item_name):
+        self.list_model.append_name(item_name)
+
+    def remove_items_from_list(self, item_names):
+        self.list_model.remove_names(item_names)
+
     def onMassEditDialogClosed(self):
         print("Mass Edit dialog closed")  # Debug info
-        self.loadXMLItems()  # Перезагрузить элементы XML
+        self.apply_filters()  # Категории могли измениться, перефильтровываем список
         self.force_update_active_item()
 
-    def get_selected_list_items(self):
-        selected_items = []
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            if item.checkState() == Qt.Checked:
-                selected_items.append(item)
-        return selected_items
+    def get_selected_names(self):
+        """Checked names that pass the current filter, in list order."""
+        return [name for name in self.list_model.checked_names() if self.proxy_model.accepts_name(name)]
 
     def refresh_active_item(self):
-        selected_items = self.get_selected_list_items()
-        if selected_items:
-            last_item_name = selected_items[-1].text()
-            for index in range(self.list_widget.count()):
-                list_item = self.list_widget.item(index)
-                if list_item.text() == last_item_name:
-                    self.list_widget.setCurrentItem(list_item)
-                    self.displayItemDetails(list_item)
-                    break
+        selected_names = self.get_selected_names()
+        if selected_names:
+            source_index = self.list_model.index_of(selected_names[-1])
+            self.list_view.setCurrentIndex(self.proxy_model.mapFromSource(source_index))
+            self.displayItemDetails(source_index)
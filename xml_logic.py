@@ -1,57 +1,82 @@
-import os
-import xml.etree.ElementTree as ET
-from PyQt5.QtWidgets import (
-    QUndoStack, QUndoCommand, QLineEdit, QComboBox, QTextEdit, QCheckBox,
-    QLabel, QPushButton, QHBoxLayout, QFileDialog
-)
-from PyQt5.QtCore import Qt
-from xml.dom import minidom
-
-class EditCommand(QUndoCommand):
-    def __init__(self, widget, new_value, description, parent=None):
-        super().__init__(description, parent)
-        self.widget = widget
-        self.new_value = new_value
-        self.old_value = self.get_current_value()
-
-    def get_current_value(self):
-        if isinstance(self.widget, QLineEdit):
-            return self.widget.text()
-        elif isinstance(self.widget, QComboBox):
-            return self.widget.currentText()
-        elif isinstance(self.widget, QTextEdit):
-            return self.widget.toPlainText()
-        elif isinstance(self.widget, QCheckBox):
-            return self.widget.isChecked()
-        return None
+import io
+from PyQt5.QtWidgets import QFileDialog
+from PyQt5.QtCore import QThread, pyqtSignal
+from type_record import TypeRecord, NUMERIC_FIELDS, FLAG_NAMES, iter_records, parse_int, load_records
+from source_document import SourceDocument
+from types_store import TypesStore
+from parallel_load import load_types_files, types_files_in_folder
+from economy_core import types_files
+from baseline_store import BASELINE_FILE
+from type_diff import records_by_name
+from economy_rules import load_rules, apply_rules
+
+class LoadXMLThread(QThread):
+    root_loaded = pyqtSignal(str, dict)
+    records_loaded = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    source_loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    CHUNK_SIZE = 500
+
+    def __init__(self, file_name):
+        super().__init__()
+        self.file_name = file_name
+
+    def run(self):
+        try:
+            with open(self.file_name, 'rb') as f:
+                data = f.read()
+            stream = io.BytesIO(data)
+            total = max(len(data), 1)
+            records = []
+            chunk = []
+            for record in iter_records(stream, self.root_loaded.emit):
+                records.append(record)
+                chunk.append(record)
+                if len(chunk) >= self.CHUNK_SIZE:
+                    self.records_loaded.emit(chunk)
+                    self.progress.emit(stream.tell() * 100 // total)
+                    chunk = []
+            if chunk:
+                self.records_loaded.emit(chunk)
+            self.source_loaded.emit(SourceDocument.from_bytes(data, records))
+            self.progress.emit(100)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class LoadFilesThread(QThread):
+    """Parses several types files in a process pool (project or folder mode)."""
+    files_loaded = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, list_files, types_only=False):
+        super().__init__()
+        # Called on this thread: listing a folder or reading cfgeconomycore.xml is I/O too
+        self.list_files = list_files
+        self.types_only = types_only
+        # Folder mode: (path, reason) of the files that could not be read
+        self.skipped = [] if types_only else None
+
+    def run(self):
+        try:
+            results = load_types_files(self.list_files(), progress=self.progress.emit, skipped=self.skipped)
+            if self.types_only:
+                results = [result for result in results if result[1] == 'types']
+            self.files_loaded.emit(results)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class XMLLogic(TypesStore):
+    """TypesStore plus the Qt side: file dialogs, background loading and the details panel."""
 
-    def undo(self):
-        self.set_value(self.old_value)
-
-    def redo(self):
-        self.set_value(self.new_value)
-
-    def set_value(self, value):
-        self.widget.blockSignals(True)
-        if isinstance(self.widget, QLineEdit):
-            self.widget.setText(value)
-        elif isinstance(self.widget, QComboBox):
-            self.widget.setCurrentText(value)
-        elif isinstance(self.widget, QTextEdit):
-            self.widget.setPlainText(value)
-        elif isinstance(self.widget, QCheckBox):
-            self.widget.setChecked(value)
-        self.widget.blockSignals(False)
-
-class XMLLogic:
     def __init__(self, viewer):
+        super().__init__()
         self.viewer = viewer
-        self.xml_root = None
         self.current_item = None
+        self.load_thread = None
         self.details_widgets = {}
-        self.undo_stacks = {}
-        self.current_undo_stack = None
-        self.initial_values = {}
 
         # Define category, usage, value, and tag options
         self.category_options = [
@@ -63,321 +88,259 @@ class XMLLogic:
         ]
         self.value_options = ["Tier1", "Tier2", "Tier3", "Tier4"]
         self.tag_options = ["shelves", "floor"]
+        self.flag_options = list(FLAG_NAMES)
 
     def openFile(self):
         options = QFileDialog.Options()
         file_name, _ = QFileDialog.getOpenFileName(self.viewer, "Open XML File", "", "XML Files (*.xml);;All Files (*)", options=options)
         if file_name:
-            self.loadXML(file_name)
+            self.loadXMLAsync(file_name)
         return file_name
 
-    def loadXML(self, file_name):
-        self.xml_tree = ET.parse(file_name)
-        self.xml_root = self.xml_tree.getroot()
+    def openProject(self):
+        options = QFileDialog.Options()
+        core_file, _ = QFileDialog.getOpenFileName(self.viewer, "Open cfgeconomycore.xml", "", "Economy core (cfgeconomycore.xml);;XML Files (*.xml);;All Files (*)", options=options)
+        if core_file:
+            self.loadProjectAsync(core_file)
+        return core_file
+
+    def openFolder(self):
+        folder = QFileDialog.getExistingDirectory(self.viewer, "Open folder with types files")
+        if folder:
+            self.loadFolderAsync(folder)
+        return folder
+
+    def mergeUpdate(self):
+        """Re-apply the loaded edits to a new vanilla types.xml (three-way merge)."""
+        if self.file_name is None or self.is_loading():
+            return
+        base_file, _ = QFileDialog.getOpenFileName(self.viewer, "Old vanilla types.xml (the edits were made against)",
+                                                   BASELINE_FILE, "XML Files (*.xml);;All Files (*)")
+        if not base_file:
+            return
+        new_file, _ = QFileDialog.getOpenFileName(self.viewer, "New vanilla types.xml", "", "XML Files (*.xml);;All Files (*)")
+        if not new_file:
+            return
+        try:
+            base = records_by_name(load_records(base_file)[2])
+            theirs = load_records(new_file)[2]
+        except (OSError, SyntaxError) as e:
+            self.viewer.show_error(f"Could not load the vanilla types:\n{e}")
+            return
+        self.viewer.show_merge_conflicts(self.merge_update(base, theirs))
+
+    def applyRules(self):
+        """Apply an economy preset (JSON/YAML rules file) to the loaded types, as one undo step."""
+        if self.file_name is None or self.is_loading():
+            return
+        rules_file, _ = QFileDialog.getOpenFileName(self.viewer, "Apply rules", "", "Rules (*.json *.yaml *.yml);;All Files (*)")
+        if not rules_file:
+            return
+        try:
+            rules = load_rules(rules_file)
+        except (OSError, ValueError) as e:
+            self.viewer.show_error(f"Could not load the rules:\n{e}")
+            return
+        self.viewer.show_rules_report(apply_rules(self, rules))
+
+    def loadProjectAsync(self, core_file):
+        """Load every types file of the mission on a worker thread, merged into one list."""
+        self._load_files_async(core_file, LoadFilesThread(lambda: types_files(core_file)))
+
+    def loadFolderAsync(self, folder):
+        """Load every types XML below folder (e.g. a mod pack), merged into one list."""
+        self._load_files_async(folder, LoadFilesThread(lambda: types_files_in_folder(folder), types_only=True))
+
+    def _load_files_async(self, file_name, thread):
+        if self.is_loading():
+            print("Already loading a file")  # Debug info
+            return
+        self.reset()
+        self.current_item = None
+        self.viewer.clear_details_layout()
+        self.viewer.begin_loading()
+
+        self.load_thread = thread
+        self.load_thread.progress.connect(self.viewer.set_load_progress)
+        self.load_thread.files_loaded.connect(lambda results: self._on_files_loaded(file_name, results))
+        self.load_thread.failed.connect(self._on_load_failed)
+        self.load_thread.start()
+
+    def _on_files_loaded(self, file_name, results):
+        self.viewer.add_items_to_list(self.add_loaded_files(results))
+        self.project = True
+        self.file_name = file_name
+        self.skipped_files = self.load_thread.skipped or []
         self.initial_values = self._get_initial_values()
+        print(f"Loaded {len(self.records)} types from {len(self.files)} files")  # Debug info
+        self.viewer.finish_loading()
+        if self.skipped_files:
+            self.viewer.show_skipped_files(self.skipped_files)
+        duplicates = self.duplicate_report()
+        if duplicates:
+            self.viewer.show_duplicates(duplicates)
+        self.open_journal(self.viewer.ask_recover_journal)
+
+    def is_loading(self):
+        return self.load_thread is not None and self.load_thread.isRunning()
+
+    def loadXMLAsync(self, file_name):
+        """Parse file_name on a worker thread, filling the list chunk by chunk."""
+        if self.is_loading():
+            print("Already loading a file")  # Debug info
+            return
+        self.reset()  # file_name is None, so Save stays disabled until loading finishes
+        self.current_item = None
+        self.viewer.clear_details_layout()
+        self.viewer.begin_loading()
+
+        self.load_thread = LoadXMLThread(file_name)
+        self.load_thread.root_loaded.connect(self._on_root_loaded)
+        self.load_thread.records_loaded.connect(self._on_records_loaded)
+        self.load_thread.progress.connect(self.viewer.set_load_progress)
+        self.load_thread.source_loaded.connect(lambda source: self._on_load_finished(file_name, source))
+        self.load_thread.failed.connect(self._on_load_failed)
+        self.load_thread.start()
+
+    def _on_root_loaded(self, tag, attrib):
+        self.open_file(self.load_thread.file_name, tag, attrib)
+
+    def _on_records_loaded(self, records):
+        self.viewer.add_items_to_list(self._add_records(records))
+
+    def _on_load_finished(self, file_name, source):
+        self.files[0].source = source
+        self.file_name = file_name
+        self.initial_values = self._get_initial_values()
+        self.viewer.finish_loading()
+        self.open_journal(self.viewer.ask_recover_journal)
+
+    def _on_load_failed(self, message):
+        print(f"Failed to load XML: {message}")  # Debug info
+        self.viewer.finish_loading(message)
+
+    def loadXML(self, file_name):
+        self.current_item = None
+        self.viewer.clear_details_layout()
+        self.load(file_name)
         self.viewer.loadXMLItems()
+        self.open_journal(self.viewer.ask_recover_journal)
+
+    def add_item(self, record, types_file=None):
+        # One batch, so the list has the row before the filters are re-applied
+        with self.batch():
+            super().add_item(record, types_file)
+            self.viewer.add_item_to_list(record.name)
+
+    def remove_items(self, names):
+        # One batch, so the filters are re-applied after the rows are gone
+        with self.batch():
+            removed = super().remove_items(names)
+            if self.current_item in removed:
+                self.current_item = None
+                self.viewer.clear_details_layout()
+            self.viewer.remove_items_from_list([record.name for record in removed])
+        return removed
+
+    def journal_failed(self, error):
+        self.viewer.show_error("Could not write the crash recovery journal, unsaved edits "
+                               f"are no longer protected against a crash:\n{error}")
+
+    def rename_item(self, record, new_name):
+        old_name = record.name
+        if super().rename_item(record, new_name):
+            self.viewer.rename_item_in_list(old_name, new_name)
+            return True
+        return False
+
+    def begin_batch(self):
+        if self._batch_depth == 0:
+            # Push pending edits from the details panel into the tree first,
+            # otherwise a later save would write stale widget values back.
+            self.saveCurrentItemDetails()
+        super().begin_batch()
 
-    def _get_initial_values(self):
-        initial_values = {}
-        for item in self.xml_root.findall('type'):
-            name = item.get('name')
-            initial_values[name] = {
-                'nominal': item.find('nominal').text if item.find('nominal') is not None else '',
-                'min': item.find('min').text if item.find('min') is not None else '',
-                'lifetime': item.find('lifetime').text if item.find('lifetime') is not None else '',
-                'restock': item.find('restock').text if item.find('restock') is not None else ''
-            }
-        return initial_values
+    def refresh_current_item(self, changed_names=None):
+        """Re-read the details panel from the tree without saving widget values."""
+        if self.current_item is None:
+            return
+        if changed_names is not None and self.current_item.name not in changed_names:
+            return
+        self._populate_details()
 
     def saveFile(self):
-        if self.xml_tree is not None:
-            file_name = self.xml_tree.getroot().attrib.get('file', 'output.xml')
+        if self.project:
+            self.save_changed_files()
+        elif self.file_name is not None:
+            file_name = self.root_attrib.get('file', 'output.xml')
             self.prettify_and_write_xml(file_name)
 
     def saveFileAs(self):
-        if self.xml_tree is not None:
+        if self.file_name is not None:
             options = QFileDialog.Options()
             file_name, _ = QFileDialog.getSaveFileName(self.viewer, "Save XML File", "", "XML Files (*.xml);;All Files (*)", options=options)
-            if file_name:
+            if file_name and self.project:
+                self.export(file_name)  # all files of the project merged into one
+            elif file_name:
                 self.prettify_and_write_xml(file_name)
 
     def prettify_and_write_xml(self, file_name):
-        rough_string = ET.tostring(self.xml_root, 'utf-8')
-        reparsed = minidom.parseString(rough_string)
-        with open(file_name, 'w', encoding='utf-8') as f:
-            f.write(reparsed.toprettyxml(indent="  "))
-
-    def get_filtered_items(self, selected_categories):
-        if selected_categories is None or not selected_categories:
-            return self.xml_root.findall('type')
-        filtered_items = []
-        for item in self.xml_root.findall('type'):
-            category = item.find('category')
-            if category is not None and category.attrib.get('name') in selected_categories:
-                filtered_items.append(item)
-        return filtered_items
+        self.save(file_name)
 
     def get_selected_items(self):
-        selected_list_items = self.viewer.get_selected_list_items()
         selected_items = []
-        for list_item in selected_list_items:
-            item = next((x for x in self.xml_root.findall('type') if x.get('name') == list_item.text()), None)
+        for name in self.viewer.get_selected_names():
+            item = self.records.get(name)
             if item is not None:
                 selected_items.append(item)
         return selected_items
 
     def saveCurrentItemDetails(self):
         if self.current_item is not None:
-            print(f"Saving current item details for: {self.current_item.get('name')}")  # Debug info
+            print(f"Saving current item details for: {self.current_item.name}")  # Debug info
+            before = [getattr(self.current_item, slot) for slot in TypeRecord.__slots__]
             if 'name' in self.details_widgets:
-                self.current_item.set('name', self.details_widgets['name'].text())
-
-            # Handle all child elements that are in self.details_widgets
-            for tag in self.details_widgets:
-                if tag in ['flags', 'category', 'usage', 'value', 'tag']:
-                    # Remove existing elements with the same tag
-                    for elem in self.current_item.findall(tag):
-                        self.current_item.remove(elem)
-                    # Add updated elements
-                    widgets = self.details_widgets[tag]
-                    if tag in ['usage', 'value']:
-                        for widget, layout in widgets:
-                            if isinstance(widget, QLineEdit):
-                                ET.SubElement(self.current_item, tag, name=widget.text())
-                            elif isinstance(widget, QComboBox):
-                                ET.SubElement(self.current_item, tag, name=widget.currentText())
-                    else:
-                        if not isinstance(widgets, list):
-                            widgets = [widgets]
-                        for widget in widgets:
-                            if isinstance(widget, QLineEdit):
-                                ET.SubElement(self.current_item, tag, name=widget.text())
-                            elif isinstance(widget, QComboBox):
-                                ET.SubElement(self.current_item, tag, name=widget.currentText())
-                else:
-                    child = self.current_item.find(tag)
-                    if child is not None:
-                        child.text = self.details_widgets[tag].text()
-
-    def displayItemDetails(self, item):
+                name_edit = self.details_widgets['name']
+                new_name = name_edit.text()
+                if not self.rename_item(self.current_item, new_name) and new_name != self.current_item.name:
+                    # Another type has this name, renaming would replace it in the records
+                    name_edit.setText(self.current_item.name)
+                    self.viewer.show_error(f"A type named '{new_name}' already exists, the name was not changed.")
+
+            # Write every field that has a widget back to the record
+            for tag, widgets in self.details_widgets.items():
+                if tag in ('usage', 'value', 'tag'):
+                    setattr(self.current_item, tag, tuple(widgets.texts()))
+                elif tag == 'category':
+                    self.current_item.category = widgets.currentText()
+                elif tag in FLAG_NAMES:
+                    self.current_item.set_flag(tag, widgets.isChecked())
+                elif tag in NUMERIC_FIELDS:
+                    setattr(self.current_item, tag, parse_int(widgets.text()))
+
+            if [getattr(self.current_item, slot) for slot in TypeRecord.__slots__] != before:
+                self.mark_changed(self.current_item.name)
+
+    def displayItemDetails(self, name):
         # Save changes of the current item before switching
         if self.current_item is not None:
             self.saveCurrentItemDetails()
 
-        self.current_item = next((x for x in self.xml_root.findall('type') if x.get('name') == item.text()), None)
+        self.current_item = self.records.get(name)
+        self._populate_details()
 
+    def _populate_details(self):
         if self.current_item is not None:
-            print(f"Displaying details for: {self.current_item.get('name')}")  # Debug info
-
-            self.viewer.clear_details_layout()
-
-            self.details_widgets.clear()
-
-            # Create or get the undo stack for the current item
-            if self.current_item.get('name') not in self.undo_stacks:
-                self.undo_stacks[self.current_item.get('name')] = QUndoStack(self.viewer)
-            self.current_undo_stack = self.undo_stacks[self.current_item.get('name')]
-
-            name_label = QLabel('Name:', self.viewer)
-            name_edit = QLineEdit(self.current_item.get('name'), self.viewer)
-            name_edit.setFixedHeight(30)
-            name_edit.textChanged.connect(lambda text, widget=name_edit: self.add_undo_command(widget, text))
-            self.viewer.details_layout.addWidget(name_label)
-            self.viewer.details_layout.addWidget(name_edit)
-            self.details_widgets['name'] = name_edit
-
-            for child in self.current_item:
-                if child.tag == 'flags':
-                    flags_label = QLabel('Flags:', self.viewer)
-                    self.viewer.details_layout.addWidget(flags_label)
-
-                    for flag in child.attrib:
-                        flag_checkbox = QCheckBox(flag, self.viewer)
-                        flag_checkbox.setChecked(child.attrib[flag] == '1')
-                        flag_checkbox.stateChanged.connect(lambda state, widget=flag_checkbox: self.add_undo_command(widget, state == Qt.Checked))
-                        self.viewer.details_layout.addWidget(flag_checkbox)
-                        self.details_widgets[flag] = flag_checkbox
-                elif child.tag == 'category':
-                    detail_label = QLabel(f"{child.tag.capitalize()}:", self.viewer)
-                    detail_combo = QComboBox(self.viewer)
-                    detail_combo.addItems(self.category_options)
-                    detail_combo.setCurrentText(child.attrib['name'])
-                    detail_combo.setFixedHeight(30)
-                    detail_combo.currentTextChanged.connect(lambda text, widget=detail_combo: self.add_undo_command(widget, text))
-                    self.viewer.details_layout.addWidget(detail_label)
-                    self.viewer.details_layout.addWidget(detail_combo)
-                    self.details_widgets['category'] = detail_combo
-                elif child.tag == 'tag':
-                    self.add_tag_field(child.attrib.get('name', ''))
-                elif child.tag == 'usage':
-                    self.add_usage_field(child.attrib['name'])
-                elif child.tag == 'value':
-                    self.add_value_field(child.attrib['name'])
-                else:
-                    detail_label = QLabel(f"{child.tag.capitalize()}:", self.viewer)
-                    detail_edit = QLineEdit(child.text, self.viewer)
-                    detail_edit.setFixedHeight(30)
-                    detail_edit.textChanged.connect(lambda text, widget=detail_edit: self.add_undo_command(widget, text))
-                    self.viewer.details_layout.addWidget(detail_label)
-                    self.viewer.details_layout.addWidget(detail_edit)
-                    self.details_widgets[child.tag] = detail_edit
-
-            # Add buttons to add new Usage and Value fields
-            add_usage_button = QPushButton('Add Usage', self.viewer)
-            add_usage_button.clicked.connect(lambda: self.add_usage_field())
-            self.viewer.details_layout.addWidget(add_usage_button)
-
-            add_value_button = QPushButton('Add Value', self.viewer)
-            add_value_button.clicked.connect(lambda: self.add_value_field())
-            self.viewer.details_layout.addWidget(add_value_button)
-
-            # Add button to add tag field
-            add_tag_button = QPushButton('Add Tag', self.viewer)
-            add_tag_button.clicked.connect(self.add_tag_field)
-            self.viewer.details_layout.addWidget(add_tag_button)
-
-    def add_usage_field(self, usage_name=''):
-        print(f"Adding usage field: {usage_name}")  # Debug info
-
-        usage_layout = QHBoxLayout()
-        detail_label = QLabel("Usage:", self.viewer)
-        detail_combo = QComboBox(self.viewer)
-        detail_combo.addItems(self.usage_options)
-        detail_combo.setCurrentText(usage_name)
-        detail_combo.setFixedHeight(30)
-        detail_combo.currentTextChanged.connect(lambda text, widget=detail_combo: self.add_undo_command(widget, text))
-        usage_layout.addWidget(detail_label)
-        usage_layout.addWidget(detail_combo)
-
-        remove_usage_button = QPushButton('Remove', self.viewer)
-        remove_usage_button.setFixedHeight(30)
-        remove_usage_button.clicked.connect(lambda: self.remove_field(usage_layout, 'usage', detail_combo))
-        usage_layout.addWidget(remove_usage_button)
-
-        insert_position = self.find_insert_position('usage')
-        self.viewer.details_layout.insertLayout(insert_position, usage_layout)
-
-        if 'usage' not in self.details_widgets:
-            self.details_widgets['usage'] = []
-        self.details_widgets['usage'].append((detail_combo, usage_layout))
-
-    def add_value_field(self, value_name=''):
-        print(f"Adding value field: {value_name}")  # Debug info
-
-        value_layout = QHBoxLayout()
-        detail_label = QLabel("Value:", self.viewer)
-        detail_combo = QComboBox(self.viewer)
-        detail_combo.addItems(self.value_options)
-        detail_combo.setCurrentText(value_name)
-        detail_combo.setFixedHeight(30)
-        detail_combo.currentTextChanged.connect(lambda text, widget=detail_combo: self.add_undo_command(widget, text))
-        value_layout.addWidget(detail_label)
-        value_layout.addWidget(detail_combo)
-
-        remove_value_button = QPushButton('Remove', self.viewer)
-        remove_value_button.setFixedHeight(30)
-        remove_value_button.clicked.connect(lambda: self.remove_field(value_layout, 'value', detail_combo))
-        value_layout.addWidget(remove_value_button)
-
-        insert_position = self.find_insert_position('value')
-        self.viewer.details_layout.insertLayout(insert_position, value_layout)
-
-        if 'value' not in self.details_widgets:
-            self.details_widgets['value'] = []
-        self.details_widgets['value'].append((detail_combo, value_layout))
-
-    def find_insert_position(self, field_type):
-        last_category_pos = None
-        last_usage_pos = None
-
-        for i in range(self.viewer.details_layout.count()):
-            item = self.viewer.details_layout.itemAt(i)
-            if item is not None:
-                widget = item.widget()
-                if widget is not None:
-                    if widget == self.details_widgets.get('category'):
-                        last_category_pos = i
-                    elif any(widget == w[0] for w in self.details_widgets.get('usage', [])):
-                        last_usage_pos = i
-
-        if field_type == 'usage':
-            if last_category_pos is not None:
-                return last_category_pos + 1
-            return 2
-
-        if field_type == 'value':
-            if last_usage_pos is not None:
-                return last_usage_pos + 1
-            if last_category_pos is not None:
-                return last_category_pos + 1
-            return 2
-
-        return self.viewer.details_layout.count() - 3
-
-    def add_tag_field(self, tag_name=''):
-        print(f"Adding tag field: {tag_name}")  # Debug info
-
-        tag_layout = QHBoxLayout()
-        detail_label = QLabel("Tag:", self.viewer)
-        detail_combo = QComboBox(self.viewer)
-        detail_combo.addItems(self.tag_options)
-        detail_combo.setCurrentText(tag_name)
-        detail_combo.setFixedHeight(30)
-        detail_combo.currentTextChanged.connect(lambda text, widget=detail_combo: self.add_undo_command(widget, text))
-        tag_layout.addWidget(detail_label)
-        tag_layout.addWidget(detail_combo)
-
-        remove_tag_button = QPushButton('Remove', self.viewer)
-        remove_tag_button.setFixedHeight(30)
-        remove_tag_button.clicked.connect(lambda: self.remove_field(tag_layout, 'tag', detail_combo))
-        tag_layout.addWidget(remove_tag_button)
-
-        insert_position = self.find_insert_position('tag')
-        self.viewer.details_layout.insertLayout(insert_position, tag_layout)
-
-        if 'tag' not in self.details_widgets:
-            self.details_widgets['tag'] = []
-        self.details_widgets['tag'].append((detail_combo, tag_layout))
-
-    def remove_field(self, layout, field_type, widget):
-        print(f"Removing field: {field_type}, widget: {widget}")  # Debug info
-
-        if field_type in self.details_widgets and widget in [w[0] for w in self.details_widgets[field_type]]:
-            self.details_widgets[field_type] = [(w, l) for w, l in self.details_widgets[field_type] if w != widget]
-            if layout is not None:
-                for i in reversed(range(layout.count())):
-                    item = layout.itemAt(i).widget()
-                    if item is not None:
-                        layout.removeWidget(item)
-                        item.deleteLater()
-
-    def add_undo_command(self, widget, new_value):
-        if isinstance(widget, QLineEdit) and widget.text() == new_value:
-            return
-        elif isinstance(widget, QComboBox) and widget.currentText() == new_value:
-            return
-        elif isinstance(widget, QTextEdit) and widget.toPlainText() == new_value:
-            return
-        elif isinstance(widget, QCheckBox) and widget.isChecked() == new_value:
-            return
+            record = self.current_item
+            print(f"Displaying details for: {record.name}")  # Debug info
 
-        command = EditCommand(widget, new_value, "Edit Value")
-        self.current_undo_stack.push(command)
+            self.details_widgets = self.viewer.details_form.bind(record)
 
     def undo(self):
-        if self.current_undo_stack and not self.current_undo_stack.isClean():
-            self.current_undo_stack.undo()
+        # Edits still in the details panel become their own step first
+        self.saveCurrentItemDetails()
+        super().undo()
 
     def redo(self):
-        if self.current_undo_stack and not self.current_undo_stack.isClean():
-            self.current_undo_stack.redo()
-
-    def _remove_layout_with_widgets(self, layout):
-        for i in reversed(range(layout.count())):
-            item = layout.itemAt(i)
-            if item is not None:
-                widget_to_remove = item.widget()
-                if widget_to_remove is not None:
-                    layout.removeWidget(widget_to_remove)
-                    widget_to_remove.deleteLater()
-        self.viewer.details_layout.removeItem(layout)
+        self.saveCurrentItemDetails()
+        super().redo()
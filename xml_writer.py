@@ -0,0 +1,77 @@
+from type_record import NUMERIC_FIELDS, LIST_FIELDS
+
+# Output layout is the same as minidom's toprettyxml(indent="  ") that Save used before
+XML_HEADER = '<?xml version="1.0" ?>\n'
+INDENT = '  '
+
+
+def _escape(value):
+    # Same as xml.sax.saxutils.escape(value, {'"': '&quot;'}); saxutils pulls in urllib at import
+    return str(value).replace('&', '&amp;').replace('>', '&gt;').replace('<', '&lt;').replace('"', '&quot;')
+
+
+def _attrs(attrib):
+    return ''.join(f' {key}="{_escape(value)}"' for key, value in attrib.items())
+
+
+def _element_lines(element, level, indent=INDENT):
+    """Pretty-print an ElementTree element kept verbatim in TypeRecord.extra."""
+    pad = indent * level
+    children = list(element)
+    text = element.text if element.text and element.text.strip() else None
+    if not children and text is None:
+        return [f'{pad}<{element.tag}{_attrs(element.attrib)}/>']
+    if not children:
+        return [f'{pad}<{element.tag}{_attrs(element.attrib)}>{_escape(text)}</{element.tag}>']
+    lines = [f'{pad}<{element.tag}{_attrs(element.attrib)}>']
+    if text is not None:
+        lines.append(pad + indent + _escape(text))
+    for child in children:
+        lines.extend(_element_lines(child, level + 1, indent))
+    lines.append(f'{pad}</{element.tag}>')
+    return lines
+
+
+def format_record(record, level=1, indent=INDENT):
+    """Return the text of one <type> block, without a trailing newline."""
+    pad = indent * level
+    inner = pad + indent
+    lines = [f'{pad}<type{_attrs({"name": record.name})}>']
+    for field in NUMERIC_FIELDS:
+        value = getattr(record, field)
+        if value is None:
+            continue
+        if value == '':
+            lines.append(f'{inner}<{field}/>')
+        else:
+            lines.append(f'{inner}<{field}>{_escape(value)}</{field}>')
+    if record.flags is not None:
+        lines.append(f'{inner}<flags{_attrs(record.flag_attrib())}/>')
+    if record.category is not None:
+        lines.append(f'{inner}<category{_attrs({"name": record.category})}/>')
+    for field in LIST_FIELDS:
+        for name in getattr(record, field):
+            lines.append(f'{inner}<{field}{_attrs({"name": name})}/>')
+    for element in record.extra:
+        lines.extend(_element_lines(element, level + 1, indent))
+    if len(lines) == 1:
+        return f'{pad}<type{_attrs({"name": record.name})}/>'
+    lines.append(f'{pad}</type>')
+    return '\n'.join(lines)
+
+
+def write_types(f, root_tag, root_attrib, records):
+    """Stream records to the text file f one <type> block at a time."""
+    f.write(XML_HEADER)
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        f.write(f'<{root_tag}{_attrs(root_attrib)}/>\n')
+        return
+    f.write(f'<{root_tag}{_attrs(root_attrib)}>\n')
+    f.write(format_record(first))
+    f.write('\n')
+    for record in records:
+        f.write(format_record(record))
+        f.write('\n')
+    f.write(f'</{root_tag}>\n')